@@ -79,6 +79,9 @@ class ImageSaver:
         self._last_save_time: Dict[str, float] = {}  # {alert_type: timestamp}
         self._save_count: Dict[str, int] = {}  # {alert_type: count}
         
+        # Sprite chữ tĩnh (title) đã rasterize sẵn: {(text, scale, color, thick): (sprite, mask, top)}
+        self._text_sprites: Dict[Tuple, Tuple[np.ndarray, np.ndarray, int]] = {}
+        
         # Tạo thư mục
         os.makedirs(artifacts_dir, exist_ok=True)
     
@@ -145,11 +148,8 @@ class ImageSaver:
         result = frame.copy()
         h, w = result.shape[:2]
         
-        # Vẽ title
-        cv2.putText(
-            result, title, (10, 30),
-            cv2.FONT_HERSHEY_SIMPLEX, 0.8, border_color, 2
-        )
+        # Vẽ title (chữ cố định - blit sprite rasterize sẵn thay vì putText)
+        self._blit_text(result, title, (10, 30), 0.8, border_color, 2)
         
         # Vẽ các dòng info
         y_offset = 60
@@ -165,6 +165,49 @@ class ImageSaver:
         
         return result
     
+    def _get_text_sprite(
+        self,
+        text: str,
+        font_scale: float,
+        color: Tuple[int, int, int],
+        thickness: int,
+    ) -> Tuple[np.ndarray, np.ndarray, int]:
+        """Rasterize chữ 1 lần vào sprite nhỏ + mask (cache theo text/style)
+        
+        Returns:
+            (sprite BGR, mask bool, khoảng cách từ baseline lên đỉnh sprite)
+        """
+        key = (text, font_scale, tuple(color), thickness)
+        cached = self._text_sprites.get(key)
+        if cached is None:
+            font = cv2.FONT_HERSHEY_SIMPLEX
+            (tw, th), baseline = cv2.getTextSize(text, font, font_scale, thickness)
+            top = th + thickness
+            sprite = np.zeros((top + baseline + thickness, tw + 2 * thickness, 3), dtype=np.uint8)
+            cv2.putText(sprite, text, (0, top), font, font_scale, color, thickness)
+            cached = (sprite, sprite.any(axis=2), top)
+            self._text_sprites[key] = cached
+        return cached
+    
+    def _blit_text(
+        self,
+        frame: np.ndarray,
+        text: str,
+        org: Tuple[int, int],
+        font_scale: float,
+        color: Tuple[int, int, int],
+        thickness: int,
+    ) -> None:
+        """Vẽ chữ bằng sprite cache (tương đương cv2.putText tại org)"""
+        sprite, mask, top = self._get_text_sprite(text, font_scale, color, thickness)
+        x, y = org[0], org[1] - top
+        h = min(sprite.shape[0], frame.shape[0] - y)
+        w = min(sprite.shape[1], frame.shape[1] - x)
+        if x < 0 or y < 0 or h <= 0 or w <= 0:
+            cv2.putText(frame, text, org, cv2.FONT_HERSHEY_SIMPLEX, font_scale, color, thickness)
+            return
+        np.copyto(frame[y:y+h, x:x+w], sprite[:h, :w], where=mask[:h, :w, None])
+    
     def save_frame(
         self,
         frame: np.ndarray,
@@ -22,6 +22,12 @@ from dataclasses import dataclass, field
 from typing import List, Dict, Any, Optional
 from pathlib import Path
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 from .camera_config import CameraConfig, PLCConfig, ROIConfig, DetectionConfig
 
 
@@ -76,12 +82,25 @@ class SystemConfig:
     # Cài đặt UI
     ui_update_interval_ms: int = 100  # Khoảng thời gian cập nhật UI (ms)
     max_log_lines: int = 100  # Số dòng log tối đa hiển thị
+    preview_interpolation: str = "linear"  # Resize preview: "nearest" | "linear" | "area"
+    preview_opencl: bool = False  # Resize preview bằng OpenCL nếu có (bật khi máy có GPU rời)
+    debug_frames: bool = False  # In thông tin frame đầu tiên của mỗi camera (debug)
     
     # Cài đặt throttling
     alert_display_interval: float = 3.0  # Giây
     image_save_interval: float = 5.0  # Giây
     ui_debounce_interval: float = 1.0  # Giây
     
+    @property
+    def camera_ids(self) -> List[str]:
+        """camera_id của mọi camera, theo thứ tự trong cameras"""
+        return [cam.camera_id for cam in self.cameras]
+    
+    @property
+    def camera_names(self) -> List[str]:
+        """Tên của mọi camera, theo thứ tự trong cameras"""
+        return [cam.name for cam in self.cameras]
+    
     def get_model_for_camera(self, camera_number: int) -> Optional[ModelConfig]:
         """Lấy model config cho camera cụ thể
         
@@ -177,6 +196,9 @@ class SystemConfig:
             "cameras": [cam.to_dict() for cam in self.cameras],
             "ui_update_interval_ms": self.ui_update_interval_ms,
             "max_log_lines": self.max_log_lines,
+            "preview_interpolation": self.preview_interpolation,
+            "preview_opencl": self.preview_opencl,
+            "debug_frames": self.debug_frames,
             "alert_display_interval": self.alert_display_interval,
             "image_save_interval": self.image_save_interval,
             "ui_debounce_interval": self.ui_debounce_interval,
@@ -214,6 +236,9 @@ class SystemConfig:
             cameras=cameras,
             ui_update_interval_ms=data.get("ui_update_interval_ms", 100),
             max_log_lines=data.get("max_log_lines", 100),
+            preview_interpolation=data.get("preview_interpolation", "linear"),
+            preview_opencl=data.get("preview_opencl", False),
+            debug_frames=data.get("debug_frames", False),
             alert_display_interval=data.get("alert_display_interval", 3.0),
             image_save_interval=data.get("image_save_interval", 5.0),
             ui_debounce_interval=data.get("ui_debounce_interval", 1.0),
@@ -231,7 +256,7 @@ class SystemConfig:
             errors.append("Phải có ít nhất 1 camera")
         
         # Kiểm tra camera_id trùng
-        ids = [cam.camera_id for cam in self.cameras]
+        ids = self.camera_ids
         if len(ids) != len(set(ids)):
             errors.append("Có camera_id bị trùng")
         
@@ -262,8 +287,14 @@ def load_config(config_path: str) -> SystemConfig:
     if not path.exists():
         raise FileNotFoundError(f"Không tìm thấy file cấu hình: {config_path}")
     
-    with open(path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    with open(path, 'rb') as f:
+        raw = f.read()
+    
+    # orjson nhanh hơn json chuẩn; lỗi parse của orjson cũng là JSONDecodeError
+    if ORJSON_AVAILABLE:
+        data = orjson.loads(raw)
+    else:
+        data = json.loads(raw.decode('utf-8'))
     
     return SystemConfig.from_dict(data)
 
@@ -280,8 +311,13 @@ def save_config(config: SystemConfig, config_path: str) -> None:
     # Tạo thư mục nếu chưa có
     path.parent.mkdir(parents=True, exist_ok=True)
     
-    with open(path, 'w', encoding='utf-8') as f:
-        json.dump(config.to_dict(), f, indent=4, ensure_ascii=False)
+    # Giữ định dạng file như cũ (indent 4, UTF-8 không escape) để lưu lại
+    # không đổi mọi dòng của file người dùng - orjson chỉ có indent 2 nên
+    # chỉ dùng cho load_config
+    data = json.dumps(config.to_dict(), indent=4, ensure_ascii=False).encode('utf-8')
+    
+    with open(path, 'wb') as f:
+        f.write(data)
 
 
 def create_default_config(num_cameras: int = 1) -> SystemConfig:
@@ -19,6 +19,7 @@ import threading
 import time
 import queue
 import gc
+import functools
 import numpy as np
 import cv2
 from typing import Optional, Callable, Any, Dict, List, Tuple
@@ -27,8 +28,22 @@ from enum import Enum
 
 from .inference_stats import get_stats_manager
 from ..plc import PLCClient, AlarmManager, AlarmConfig, AlarmType
+from ..detection.roi_utils import scale_polygon
 from ..alerting import AlertLogger, ImageSaver
 
+def configure_opencl(enabled: bool) -> bool:
+    """Bật/tắt OpenCL (T-API) của OpenCV cho cả process - gọi 1 lần khi khởi động app
+    
+    Returns:
+        True nếu OpenCL được bật (enabled và máy hỗ trợ)
+    """
+    try:
+        use = bool(enabled) and cv2.ocl.haveOpenCL()
+        cv2.ocl.setUseOpenCL(use)
+        return use
+    except Exception:
+        return False
+
 
 class WorkerStatus(Enum):
     """Trạng thái worker"""
@@ -81,6 +96,11 @@ class WorkerConfig:
     detection_interval: float = 0.5  # seconds between detection
     buffer_size: int = 1
     enable_grab_pattern: bool = True
+    # Resize preview cho GUI: "nearest" (nhanh nhất) | "linear" | "area" (đẹp nhất)
+    preview_interpolation: str = "linear"
+    # Dùng cv2.UMat (OpenCL) cho resize preview - app bật OpenCL cho cả
+    # process 1 lần bằng configure_opencl() rồi truyền kết quả vào đây
+    preview_opencl: bool = False
 
 
 class OptimizedCameraWorker:
@@ -117,6 +137,12 @@ class OptimizedCameraWorker:
     """
     
     # Constants
+    PREVIEW_INTERP = {
+        "nearest": cv2.INTER_NEAREST,
+        "linear": cv2.INTER_LINEAR,
+        "area": cv2.INTER_AREA,
+    }
+    DISPLAY_BUFFERS = 3  # GUI copy frame dưới lock (get_display_rgb) nên 3 buffer là đủ
     MAX_GRAB_COUNT = 3
     MIN_RECONNECT_INTERVAL = 0.5
     MAX_RECONNECT_INTERVAL = 10.0
@@ -163,6 +189,28 @@ class OptimizedCameraWorker:
         self._display_frame: Optional[np.ndarray] = None
         self._display_frame_lock = threading.Lock()
         
+        # Frame RGB đã letterbox sẵn cho GUI (tính trong thread worker,
+        # None nếu GUI chưa set kích thước hiển thị)
+        self._display_size: Optional[Tuple[int, int]] = None
+        self._display_rgb: Optional[np.ndarray] = None
+        self._display_seq = 0  # Tăng mỗi lần publish frame RGB mới
+        # Callback(camera_id) báo GUI có frame RGB mới (gọi từ thread worker,
+        # chỉ được đánh dấu - không gọi Tk)
+        self.frame_callback: Optional[Callable[[int], None]] = None
+        # Vòng buffer output cấp phát sẵn (warpAffine/cvtColor ghi qua dst=)
+        self._display_bufs: List[Optional[np.ndarray]] = [None] * self.DISPLAY_BUFFERS
+        self._display_buf_idx = 0
+        self._letterbox_lock = threading.Lock()  # Capture + detection thread đều publish
+        # (key, M, render): render(src, dst=...) đã bake sẵn M/dsize/flags
+        self._letterbox_cache: Optional[Tuple[Tuple[int, int, int, int], np.ndarray, Callable]] = None
+        # Preview chỉ để xem nên mặc định INTER_LINEAR; INTER_AREA dành cho
+        # pipeline AI / khi cần chất lượng
+        self._preview_interp = self.PREVIEW_INTERP.get(config.preview_interpolation, cv2.INTER_LINEAR)
+        # T-API: warpAffine trên UMat chạy bằng OpenCL (GPU/iGPU); UMat đích
+        # giữ lại giữa các frame: ((w, h), UMat)
+        self._use_umat = config.preview_opencl
+        self._umat_dst: Optional[Tuple[Tuple[int, int], Any]] = None
+        
         # Detection queue (separate from display)
         self._detection_queue: queue.Queue = queue.Queue(maxsize=2)
         
@@ -196,10 +244,9 @@ class OptimizedCameraWorker:
         self._coal_no_blockage_count = 0
         self._last_coal_ratio = 0.0
         
-        # Cache ROI scaled để tránh tính toán lại mỗi frame
-        self._cached_roi_person: Optional[List[Tuple[int, int]]] = None
-        self._cached_roi_coal: Optional[List[Tuple[int, int]]] = None
-        self._cached_frame_size: Optional[Tuple[int, int]] = None
+        # Cache ROI scaled (np.int32) để tránh tính toán lại mỗi frame:
+        # ((w, h), pts_person, pts_coal) - gán 1 lần nên an toàn giữa 2 thread
+        self._roi_pts_cache: Optional[Tuple[Tuple[int, int], Optional[np.ndarray], Optional[np.ndarray]]] = None
         
         # Alarm state
         self.person_alarm_active = False
@@ -370,6 +417,7 @@ class OptimizedCameraWorker:
         # TỐI ƯU MEMORY: Clear all frames và results
         with self._display_frame_lock:
             self._display_frame = None
+            self._display_rgb = None
         with self._latest_result_lock:
             self._latest_result = None
         
@@ -411,6 +459,118 @@ class OptimizedCameraWorker:
                 return None
             return self._display_frame.copy() if copy else self._display_frame
     
+    def set_display_size(self, width: int, height: int) -> None:
+        """Đặt kích thước hiển thị của GUI - worker sẽ letterbox + BGR->RGB sẵn
+        
+        Args:
+            width, height: Kích thước vùng video trên panel
+        """
+        size = (int(width), int(height))
+        if size != self._display_size:
+            self._display_size = size
+    
+    @property
+    def frame_seq(self) -> int:
+        """Seq frame RGB mới nhất - đọc không lock để GUI so sánh trước khi lấy frame"""
+        return self._display_seq
+    
+    def get_display_rgb(self) -> Tuple[int, Optional[np.ndarray]]:
+        """Lấy bản copy frame RGB đã letterbox theo kích thước hiển thị
+        
+        Returns:
+            (seq, frame): seq tăng mỗi lần có frame mới; frame là mảng
+            (height, width, 3) RGB hoặc None. Copy dưới lock nên worker không
+            thể quay vòng buffer ghi đè lên frame trong lúc GUI đang đọc.
+        """
+        with self._display_frame_lock:
+            rgb = self._display_rgb
+            return self._display_seq, (rgb.copy() if rgb is not None else None)
+    
+    def _letterbox_rgb(self, frame: np.ndarray) -> Optional[np.ndarray]:
+        """Resize giữ tỷ lệ + viền đen + BGR->RGB cho GUI (chạy trong thread worker)"""
+        size = self._display_size
+        if size is None:
+            return None
+        disp_w, disp_h = size
+        h, w = frame.shape[:2]
+        if w <= 0 or h <= 0:
+            return None
+        
+        # Ma trận scale + dịch và hàm render chuyên biệt, cache theo kích thước
+        # nguồn/đích - mỗi frame chỉ còn gọi render(frame, dst=out)
+        key = (w, h, disp_w, disp_h)
+        cache = self._letterbox_cache
+        if cache is None or cache[0] != key:
+            cache = self._letterbox_cache = self._build_letterbox(w, h, disp_w, disp_h)
+        render = cache[2]
+        
+        with self._letterbox_lock:
+            # Buffer output kế tiếp trong vòng (cấp phát lại khi đổi kích thước)
+            idx = (self._display_buf_idx + 1) % self.DISPLAY_BUFFERS
+            out = self._display_bufs[idx]
+            if out is None or out.shape[0] != disp_h or out.shape[1] != disp_w:
+                out = self._display_bufs[idx] = np.empty((disp_h, disp_w, 3), dtype=np.uint8)
+            self._display_buf_idx = idx
+            
+            if self._use_umat and self._preview_interp != cv2.INTER_AREA:
+                # OpenCL: warp vào UMat đích giữ sẵn, tải về rồi BGR->RGB
+                # thẳng vào buffer vòng (không giữ mảng .get() mới mỗi frame)
+                try:
+                    umat = self._umat_dst
+                    if umat is None or umat[0] != size:
+                        umat = self._umat_dst = (size, cv2.UMat(disp_h, disp_w, cv2.CV_8UC3))
+                    warped = render(cv2.UMat(frame), dst=umat[1])
+                    return cv2.cvtColor(warped.get(), cv2.COLOR_BGR2RGB, dst=out)
+                except cv2.error:
+                    self._use_umat = False  # Lỗi OpenCL -> dùng CPU từ giờ
+            
+            render(frame, dst=out)
+            return cv2.cvtColor(out, cv2.COLOR_BGR2RGB, dst=out)
+    
+    def _build_letterbox(self, w: int, h: int, disp_w: int, disp_h: int) -> Tuple:
+        """Tính M và tạo hàm render(src, dst=None) cho 1 cặp kích thước nguồn/đích
+        
+        Returns:
+            (key, M, render)
+        """
+        scale = max(0.1, min(disp_w / w, disp_h / h, 3.0))
+        M = np.array([[scale, 0, (disp_w - w * scale) // 2],
+                      [0, scale, (disp_h - h * scale) // 2]], dtype=np.float32)
+        
+        if self._preview_interp == cv2.INTER_AREA:
+            # warpAffine không hỗ trợ INTER_AREA -> resize + viền đen
+            new_w = min(disp_w, max(1, int(w * scale)))
+            new_h = min(disp_h, max(1, int(h * scale)))
+            x_off, y_off = max(0, int(M[0, 2])), max(0, int(M[1, 2]))
+            border = (y_off, disp_h - new_h - y_off, x_off, disp_w - new_w - x_off)
+            
+            def render(src, dst=None):
+                return cv2.copyMakeBorder(
+                    cv2.resize(src, (new_w, new_h), interpolation=cv2.INTER_AREA),
+                    *border, cv2.BORDER_CONSTANT, dst=dst, value=(0, 0, 0))
+        else:
+            render = functools.partial(cv2.warpAffine, M=M, dsize=(disp_w, disp_h),
+                                       flags=self._preview_interp,
+                                       borderMode=cv2.BORDER_CONSTANT, borderValue=(0, 0, 0))
+        
+        return (w, h, disp_w, disp_h), M, render
+    
+    def _publish_display(self, frame: np.ndarray) -> None:
+        """Cập nhật atomic frame display (BGR) và bản RGB cho GUI"""
+        rgb = self._letterbox_rgb(frame)
+        with self._display_frame_lock:
+            self._display_frame = frame
+            if rgb is not None:
+                self._display_rgb = rgb
+                self._display_seq += 1
+        
+        callback = self.frame_callback
+        if rgb is not None and callback is not None:
+            try:
+                callback(self.camera_id)
+            except:
+                pass
+    
     def get_latest_result(self) -> Optional[Tuple[np.ndarray, Any, bool, float]]:
         """Lấy result detection mới nhất
         
@@ -572,8 +732,7 @@ class OptimizedCameraWorker:
                     frame_with_roi = self._draw_roi_on_frame_optimized_cached(frame)
                     
                     # ===== ATOMIC FRAME UPDATE (với ROI) =====
-                    with self._display_frame_lock:
-                        self._display_frame = frame_with_roi
+                    self._publish_display(frame_with_roi)
                     
                     # Put to detection queue (không block)
                     try:
@@ -669,8 +828,7 @@ class OptimizedCameraWorker:
                 self._update_person_alarm_state(person_detected, frame, display_frame)
                 
                 # Update display frame với segment
-                with self._display_frame_lock:
-                    self._display_frame = display_frame
+                self._publish_display(display_frame)
                 
                 # Store result (cần giữ lại cho UI/log - KHÔNG release)
                 with self._latest_result_lock:
@@ -709,14 +867,13 @@ class OptimizedCameraWorker:
         
         try:
             h, w = frame.shape[:2]
-            roi_coal = self._scale_roi(self.config.roi_coal, w, h)
+            _, roi_polygon = self._get_roi_pts(w, h)
             
-            if not roi_coal:
+            if roi_polygon is None:
                 return False, 0.0
             
             # Create ROI mask
             roi_mask = np.zeros((h, w), dtype=np.uint8)
-            roi_polygon = np.array(roi_coal, dtype=np.int32)
             cv2.fillPoly(roi_mask, [roi_polygon], 255)
             roi_area = cv2.countNonZero(roi_mask)
             
@@ -867,14 +1024,13 @@ class OptimizedCameraWorker:
         
         try:
             h, w = frame.shape[:2]
-            roi_person = self._scale_roi(self.config.roi_person, w, h)
+            roi_polygon, _ = self._get_roi_pts(w, h)
             
-            if not roi_person or result is None or result.boxes is None:
+            if roi_polygon is None or result is None or result.boxes is None:
                 return False
             
             # Create ROI mask
             roi_mask = np.zeros((h, w), dtype=np.uint8)
-            roi_polygon = np.array(roi_person, dtype=np.int32)
             cv2.fillPoly(roi_mask, [roi_polygon], 255)
             
             boxes = result.boxes
@@ -911,13 +1067,18 @@ class OptimizedCameraWorker:
             return False
     
     def _draw_segments_on_frame(self, frame: np.ndarray, result: Any) -> np.ndarray:
-        """Vẽ segment người và than lên frame (tham khảo coal_12_12_v1.py)"""
+        """Vẽ segment người và than lên frame (tham khảo coal_12_12_v1.py)
+        
+        Vẽ thẳng lên frame truyền vào (caller đã copy) - không cấp phát thêm
+        buffer cỡ frame.
+        """
         if result is None or result.masks is None or result.boxes is None:
             # Vẫn vẽ ROI ngay cả khi không có detection
-            return self._draw_roi_on_frame(frame)
+            self._draw_roi_inplace(frame)
+            return frame
         
         h, w = frame.shape[:2]
-        display_frame = frame.copy()
+        display_frame = frame
         
         boxes = result.boxes
         masks = result.masks
@@ -976,12 +1137,11 @@ class OptimizedCameraWorker:
                 del mask_binary, contours  # Release nếu không dùng
                 continue
             
-            # Tô màu overlay cho segment
-            colored_mask = np.zeros_like(display_frame)
-            colored_mask[mask_binary > 0] = color
-            # Blend segment với alpha
-            mask_3channel = np.stack([mask_binary, mask_binary, mask_binary], axis=2) / 255.0
-            display_frame = (display_frame * (1 - mask_3channel * alpha) + colored_mask * (mask_3channel * alpha)).astype(np.uint8)
+            # Blend màu segment với alpha, chỉ trên pixel thuộc mask (ghi in-place;
+            # pixel ngoài mask giữ nguyên như công thức blend cả frame trước đây)
+            sel = mask_binary > 0
+            display_frame[sel] = (display_frame[sel] * (1 - alpha)
+                                  + np.array(color) * alpha).astype(np.uint8)
             
             # Vẽ viền contour cho segment (dùng contours đã tính ở trên)
             if contours:
@@ -989,93 +1149,74 @@ class OptimizedCameraWorker:
             
             # TỐI ƯU MEMORY: Release intermediate arrays sau khi vẽ xong
             # (Arrays sẽ được GC tự động khi out of scope)
-            del colored_mask, mask_3channel, mask_binary, contours
+            del sel, mask_binary, contours
         
         # Vẽ ROI lên frame (sau khi vẽ segment)
-        display_frame = self._draw_roi_on_frame(display_frame)
+        self._draw_roi_inplace(display_frame)
         
         return display_frame
     
-    def _draw_roi_on_frame_optimized_cached(self, frame: np.ndarray) -> np.ndarray:
-        """Vẽ ROI lên frame (tối ưu - cache ROI scaled, chỉ copy frame)"""
-        h, w = frame.shape[:2]
-        current_size = (w, h)
+    def set_roi(self, roi_person: List[Tuple[int, int]], roi_coal: List[Tuple[int, int]],
+                reference: Optional[Tuple[int, int]] = None) -> None:
+        """Cập nhật ROI và xóa cache ROI đã scale"""
+        self.config.roi_person = list(roi_person)
+        self.config.roi_coal = list(roi_coal)
+        if reference is not None:
+            self.config.reference_resolution = tuple(reference)
+        self._roi_pts_cache = None
+    
+    def _get_roi_pts(self, w: int, h: int) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """ROI người/than đã scale theo kích thước frame (np.int32, cache)
         
-        # Kiểm tra xem có cần tính lại ROI không (khi frame size thay đổi)
-        if self._cached_frame_size != current_size:
-            # Tính lại và cache ROI scaled
-            self._cached_roi_person = self._scale_roi(self.config.roi_person, w, h)
-            self._cached_roi_coal = self._scale_roi(self.config.roi_coal, w, h)
-            self._cached_frame_size = current_size
+        Chỉ tính lại khi kích thước frame đổi hoặc sau set_roi().
         
+        Returns:
+            (pts_person, pts_coal) - None nếu ROI trống
+        """
+        cache = self._roi_pts_cache
+        if cache is None or cache[0] != (w, h):
+            roi_person = self._scale_roi(self.config.roi_person, w, h)
+            roi_coal = self._scale_roi(self.config.roi_coal, w, h)
+            cache = self._roi_pts_cache = ((w, h), roi_person, roi_coal)
+        return cache[1], cache[2]
+    
+    def _draw_roi_on_frame_optimized_cached(self, frame: np.ndarray) -> np.ndarray:
+        """Vẽ ROI lên frame (tối ưu - cache ROI scaled, chỉ copy frame)"""
         # Copy frame (cần thiết để không ảnh hưởng frame gốc)
         display_frame = frame.copy()
+        self._draw_roi_inplace(display_frame)
+        return display_frame
+    
+    def _draw_roi_inplace(self, display_frame: np.ndarray) -> None:
+        """Vẽ ROI người/than thẳng lên frame (không copy)"""
+        h, w = display_frame.shape[:2]
+        pts_person, pts_coal = self._get_roi_pts(w, h)
         
         # Vẽ ROI người (màu vàng) - dùng cached (không cần tính lại)
-        if self._cached_roi_person and len(self._cached_roi_person) >= 3:
-            pts = np.array(self._cached_roi_person, dtype=np.int32)
-            cv2.polylines(display_frame, [pts], True, (0, 255, 255), 2)
+        if pts_person is not None and len(pts_person) >= 3:
+            cv2.polylines(display_frame, [pts_person], True, (0, 255, 255), 2)
         
         # Vẽ ROI than (màu đỏ) - dùng cached (không cần tính lại)
-        if self._cached_roi_coal and len(self._cached_roi_coal) >= 3:
-            pts = np.array(self._cached_roi_coal, dtype=np.int32)
-            cv2.polylines(display_frame, [pts], True, (0, 0, 255), 2)
-        
-        return display_frame
+        if pts_coal is not None and len(pts_coal) >= 3:
+            cv2.polylines(display_frame, [pts_coal], True, (0, 0, 255), 2)
     
     def _draw_roi_on_frame_optimized(self, frame: np.ndarray) -> np.ndarray:
         """Vẽ ROI lên frame (copy frame) - dùng cho detection loop"""
-        h, w = frame.shape[:2]
-        display_frame = frame.copy()
-        
-        # Scale ROI theo kích thước frame
-        roi_person = self._scale_roi(self.config.roi_person, w, h)
-        roi_coal = self._scale_roi(self.config.roi_coal, w, h)
-        
-        # Vẽ ROI người (màu vàng)
-        if roi_person and len(roi_person) >= 3:
-            pts = np.array(roi_person, dtype=np.int32)
-            cv2.polylines(display_frame, [pts], True, (0, 255, 255), 2)
-        
-        # Vẽ ROI than (màu đỏ)
-        if roi_coal and len(roi_coal) >= 3:
-            pts = np.array(roi_coal, dtype=np.int32)
-            cv2.polylines(display_frame, [pts], True, (0, 0, 255), 2)
-        
-        return display_frame
+        return self._draw_roi_on_frame_optimized_cached(frame)
     
     def _draw_roi_on_frame(self, frame: np.ndarray) -> np.ndarray:
         """Vẽ ROI người và than lên frame (dùng cho detection loop)"""
-        h, w = frame.shape[:2]
-        display_frame = frame.copy()
-        
-        # Scale ROI theo kích thước frame
-        roi_person = self._scale_roi(self.config.roi_person, w, h)
-        roi_coal = self._scale_roi(self.config.roi_coal, w, h)
-        
-        # Vẽ ROI người (màu vàng)
-        if roi_person and len(roi_person) >= 3:
-            pts = np.array(roi_person, dtype=np.int32)
-            cv2.polylines(display_frame, [pts], True, (0, 255, 255), 2)
-        
-        # Vẽ ROI than (màu đỏ)
-        if roi_coal and len(roi_coal) >= 3:
-            pts = np.array(roi_coal, dtype=np.int32)
-            cv2.polylines(display_frame, [pts], True, (0, 0, 255), 2)
-        
-        return display_frame
+        return self._draw_roi_on_frame_optimized_cached(frame)
     
     def _scale_roi(self, roi_points: List[Tuple[int, int]], 
-                   target_w: int, target_h: int) -> List[Tuple[int, int]]:
-        """Scale ROI theo kích thước frame"""
-        if not roi_points:
-            return roi_points
+                   target_w: int, target_h: int) -> Optional[np.ndarray]:
+        """Scale ROI theo kích thước frame (kernel numba/numpy trong roi_utils)
         
+        Returns:
+            Mảng (N, 2) np.int32 hoặc None nếu ROI trống
+        """
         ref_w, ref_h = self.config.reference_resolution
-        scale_x = target_w / ref_w
-        scale_y = target_h / ref_h
-        
-        return [(int(x * scale_x), int(y * scale_y)) for (x, y) in roi_points]
+        return scale_polygon(roi_points, target_w / ref_w, target_h / ref_h)
     
     def get_stats_dict(self) -> Dict[str, Any]:
         """Lấy statistics dạng dict"""
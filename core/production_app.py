@@ -18,7 +18,8 @@ from dataclasses import dataclass
 
 from ..config import SystemConfig, CameraConfig
 from ..detection import MultiModelLoader
-from .optimized_worker import OptimizedCameraWorker, WorkerConfig, WorkerStatus
+from ..detection import roi_utils
+from .optimized_worker import OptimizedCameraWorker, WorkerConfig, WorkerStatus, configure_opencl
 from .inference_stats import get_stats_manager, InferenceStatsManager
 
 
@@ -97,6 +98,10 @@ class ProductionMultiCameraApp:
         self.on_log = on_log
         self.on_status_change = on_status_change
         
+        # OpenCL là thiết lập toàn process của OpenCV -> đặt 1 lần ở đây,
+        # mọi worker dùng cùng kết quả
+        self._use_opencl = configure_opencl(config.preview_opencl)
+        
         # Model loader
         self._model_loader = MultiModelLoader.get_instance()
         self._models_loaded = False
@@ -150,7 +155,9 @@ class ProductionMultiCameraApp:
         try:
             self._log("🔄 Loading YOLO models...")
             
-            results = self._model_loader.load_from_config(self.config)
+            results = self._model_loader.load_from_config(
+                self.config, on_result=self._on_model_loaded
+            )
             
             success_count = sum(1 for v in results.values() if v)
             
@@ -158,13 +165,6 @@ class ProductionMultiCameraApp:
                 self._log("❌ Không thể load model nào!")
                 return False
             
-            # Log model info
-            for model_id, success in results.items():
-                if success:
-                    info = self._model_loader.get_model_info(model_id)
-                    if info:
-                        self._log(f"✅ {info.name}: cameras {info.cameras}")
-            
             self._models_loaded = True
             self._log(f"✅ Đã load {success_count} model(s)")
             
@@ -180,6 +180,15 @@ class ProductionMultiCameraApp:
             self._log(f"❌ Lỗi load model: {str(e)}")
             return False
     
+    def _on_model_loaded(self, model_id: str, success: bool) -> None:
+        """Log ngay khi từng model load xong (gọi từ thread load model)"""
+        if not success:
+            self._log(f"❌ Load model {model_id} thất bại")
+            return
+        info = self._model_loader.get_model_info(model_id)
+        if info:
+            self._log(f"✅ {info.name}: cameras {info.cameras}")
+    
     def _create_worker_config(self, cam: CameraConfig) -> WorkerConfig:
         """Tạo WorkerConfig từ CameraConfig"""
         return WorkerConfig(
@@ -214,6 +223,8 @@ class ProductionMultiCameraApp:
             detection_interval=0.5,  # 2 FPS detection
             buffer_size=1,  # Low latency
             enable_grab_pattern=True,  # Skip old frames
+            preview_interpolation=self.config.preview_interpolation,
+            preview_opencl=self._use_opencl,
         )
     
     def start_all(self) -> Dict[int, bool]:
@@ -226,6 +237,9 @@ class ProductionMultiCameraApp:
             if not self.load_models():
                 return {}
         
+        # Warm-up JIT kernel ROI trước khi worker chạy frame đầu tiên
+        roi_utils.warmup()
+        
         results = {}
         self._start_time = time.time()
         
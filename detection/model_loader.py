@@ -15,7 +15,8 @@ import sys
 import threading
 import torch
 import numpy as np
-from typing import Optional, Dict, Any, List
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional, Dict, Any, List, Callable
 from dataclasses import dataclass
 
 
@@ -115,31 +116,61 @@ class MultiModelLoader:
             return list(self._model_infos.values())[0]
         return None
     
-    def load_from_config(self, system_config) -> Dict[str, bool]:
+    def load_from_config(self, system_config,
+                         on_result: Optional[Callable[[str, bool], None]] = None) -> Dict[str, bool]:
         """Load tất cả models từ SystemConfig
         
+        Các model được load song song (torch nhả GIL khi đọc file/khởi tạo CUDA).
+        Map camera -> model được dựng lại theo thứ tự config sau khi load xong
+        (model sau trong config thắng khi dùng chung camera, như khi load tuần tự).
+        
         Args:
             system_config: SystemConfig object
+            on_result: Callback(model_id, success) gọi ngay khi từng model load xong
             
         Returns:
-            Dict[model_id, success] - kết quả load cho từng model
+            Dict[model_id, success] - kết quả load cho từng model (theo thứ tự config)
         """
         results = {}
         
         if system_config.models:
             # Load từ config models
-            for model_id, model_cfg in system_config.models.items():
-                try:
-                    success = self.load(
+            items = list(system_config.models.items())
+            # Import ultralytics 1 lần trước khi vào pool (tránh nhiều thread
+            # cùng import lần đầu -> module khởi tạo dở)
+            try:
+                from ultralytics import YOLO  # noqa: F401
+            except ImportError:
+                pass  # load() báo lỗi cho từng model
+            with ThreadPoolExecutor(max_workers=min(6, len(items)),
+                                    thread_name_prefix="model-load") as pool:
+                futures = {
+                    pool.submit(
+                        self.load,
                         model_id=model_id,
                         model_path=model_cfg.path,
                         model_name=model_cfg.name,
                         cameras=model_cfg.cameras
-                    )
+                    ): model_id
+                    for model_id, model_cfg in items
+                }
+                for future in as_completed(futures):
+                    model_id = futures[future]
+                    try:
+                        success = future.result()
+                    except Exception as e:
+                        print(f"[ERROR] Load model {model_id} failed: {e}")
+                        success = False
                     results[model_id] = success
-                except Exception as e:
-                    print(f"[ERROR] Load model {model_id} failed: {e}")
-                    results[model_id] = False
+                    if on_result:
+                        on_result(model_id, success)
+            results = {model_id: results[model_id] for model_id, _ in items}
+            
+            with self._lock:
+                for model_id, model_cfg in items:
+                    if results[model_id]:
+                        for cam_num in model_cfg.cameras:
+                            self._camera_model_map[cam_num] = model_id
         else:
             # Backward compatible: load từ model_path
             try:
@@ -153,6 +184,8 @@ class MultiModelLoader:
             except Exception as e:
                 print(f"[ERROR] Load default model failed: {e}")
                 results["default"] = False
+            if on_result:
+                on_result("default", results["default"])
         
         return results
     
@@ -176,10 +209,13 @@ class MultiModelLoader:
         if cameras is None:
             cameras = []
         
-        # Kiểm tra đã load chưa
-        if model_id in self._models:
-            print(f"[INFO] Model {model_id} đã được load, bỏ qua")
-            return True
+        # Kiểm tra đã load chưa + lấy lock của model (load() chạy song song
+        # trong load_from_config nên mọi bookkeeping đi qua self._lock)
+        with self._lock:
+            if model_id in self._models:
+                print(f"[INFO] Model {model_id} đã được load, bỏ qua")
+                return True
+            inference_lock = self._inference_locks.setdefault(model_id, threading.Lock())
         
         # Tìm đường dẫn model
         resolved_path = self._resolve_model_path(model_path)
@@ -191,11 +227,7 @@ class MultiModelLoader:
             # Import YOLO (lazy import)
             from ultralytics import YOLO
             
-            # Tạo lock cho model này
-            if model_id not in self._inference_locks:
-                self._inference_locks[model_id] = threading.Lock()
-            
-            with self._inference_locks[model_id]:
+            with inference_lock:
                 model = YOLO(resolved_path)
                 
                 # TỐI ƯU GPU: Đưa model lên GPU nếu có
@@ -230,9 +262,8 @@ class MultiModelLoader:
                 person_id = self._find_class_id(class_names, ['person', 'Person'])
                 coal_id = self._find_class_id(class_names, ['coal', 'Coal', 'than'])
                 
-                # Lưu model
-                self._models[model_id] = model
-                self._model_infos[model_id] = ModelInfo(
+                # Lưu model + map cameras -> model
+                info = ModelInfo(
                     model_id=model_id,
                     path=resolved_path,
                     name=model_name,
@@ -242,10 +273,11 @@ class MultiModelLoader:
                     cameras=cameras,
                     is_loaded=True,
                 )
-                
-                # Map cameras -> model
-                for cam_num in cameras:
-                    self._camera_model_map[cam_num] = model_id
+                with self._lock:
+                    self._models[model_id] = model
+                    self._model_infos[model_id] = info
+                    for cam_num in cameras:
+                        self._camera_model_map[cam_num] = model_id
             
             # Log GPU memory và verify GPU nếu có GPU
             if torch.cuda.is_available():
@@ -0,0 +1,64 @@
+"""
+ROI Utils Module
+================
+
+Kernel tính toán ROI dùng chung cho worker và UI:
+- Scale polygon ROI theo độ phân giải (ghi in-place vào mảng int32)
+- JIT bằng numba nếu có cài, fallback numpy nếu không
+"""
+
+import numpy as np
+from typing import Optional
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+def _scale_polygon_np(pts, sx, sy, ox, oy, out):
+    """Fallback numpy: out = int(pts * scale) + offset"""
+    out[:, 0] = (pts[:, 0] * sx).astype(np.int32) + ox
+    out[:, 1] = (pts[:, 1] * sy).astype(np.int32) + oy
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _scale_polygon_jit(pts, sx, sy, ox, oy, out):
+        """Kernel JIT: out = int(pts * scale) + offset (ghi in-place)"""
+        for i in range(pts.shape[0]):
+            out[i, 0] = np.int32(pts[i, 0] * sx) + ox
+            out[i, 1] = np.int32(pts[i, 1] * sy) + oy
+
+    _scale_polygon_kernel = _scale_polygon_jit
+else:
+    _scale_polygon_kernel = _scale_polygon_np
+
+
+def scale_polygon(pts, sx: float, sy: float, ox: int = 0, oy: int = 0,
+                  out: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+    """Scale polygon ROI: (x * sx) + ox, (y * sy) + oy, cắt phần thập phân như int()
+
+    Args:
+        pts: Danh sách điểm [(x, y), ...] hoặc mảng (N, 2)
+        sx, sy: Hệ số scale
+        ox, oy: Offset cộng thêm sau khi scale
+        out: Mảng (N, 2) int32 để ghi kết quả (None = cấp phát mới)
+
+    Returns:
+        Mảng (N, 2) np.int32 hoặc None nếu pts trống
+    """
+    if pts is None or len(pts) == 0:
+        return None
+
+    pts = np.asarray(pts, dtype=np.float64).reshape(-1, 2)
+    if out is None:
+        out = np.empty(pts.shape, dtype=np.int32)
+    _scale_polygon_kernel(pts, float(sx), float(sy), int(ox), int(oy), out)
+    return out
+
+
+def warmup() -> None:
+    """Gọi thử 1 lần để numba compile trước (tránh trễ ở frame đầu tiên)"""
+    scale_polygon([(0, 0), (1, 0), (1, 1)], 1.0, 1.0)
@@ -6,15 +6,19 @@ Kết nối và giao tiếp với PLC Siemens S7-300/400 qua Snap7.
 
 Features:
 - Auto reconnect
-- Thread-safe operations
+- Thread-safe operations (mọi lệnh Snap7 chạy trên 1 luồng I/O riêng)
 - Health check
 - Bit-level read/write
+- Cache DB theo trang (gộp nhiều lần đọc vào 1 lần db_read)
 """
 
+import ctypes
 import threading
 import time
+import queue
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 from enum import Enum
-from typing import Optional, Callable
+from typing import Optional, Callable, Dict, List, Tuple
 from dataclasses import dataclass
 
 try:
@@ -25,6 +29,17 @@ except ImportError:
     SNAP7_AVAILABLE = False
     print("Warning: snap7 not installed. PLC communication will be disabled.")
 
+# ReadMultiVars/WriteMultiVars (gộp nhiều biến vào 1 frame S7)
+try:
+    try:
+        from snap7.types import S7DataItem, S7AreaDB, S7WLByte
+    except ImportError:  # python-snap7 >= 2.0
+        from snap7.type import S7DataItem, Area, WordLen
+        S7AreaDB, S7WLByte = Area.DB, WordLen.Byte
+    MULTI_VARS_AVAILABLE = True
+except ImportError:
+    MULTI_VARS_AVAILABLE = False
+
 
 class PLCConnectionState(Enum):
     """Trạng thái kết nối PLC"""
@@ -35,7 +50,7 @@ class PLCConnectionState(Enum):
     RECONNECTING = "reconnecting"
 
 
-@dataclass
+@dataclass(slots=True)
 class PLCConnectionConfig:
     """Cấu hình kết nối PLC"""
     ip: str = "192.168.0.4"
@@ -52,7 +67,8 @@ class PLCClient:
     Client giao tiếp với PLC Siemens S7
     
     Features:
-    - Thread-safe
+    - Thread-safe: Snap7 client không thread-safe nên mọi lệnh được đưa
+      vào hàng đợi và thực thi tuần tự trên 1 luồng I/O duy nhất
     - Auto reconnect với backoff
     - Health check định kỳ
     - Callback khi trạng thái thay đổi
@@ -75,8 +91,33 @@ class PLCClient:
         
         # Ngắt kết nối
         client.disconnect()
+        
+        # Hoặc dùng chung 1 kết nối cho nhiều nơi
+        client = PLCClient.acquire("192.168.0.4", 0, 2)
+        ...
+        PLCClient.release(client)
     """
     
+    # Thuộc tính cố định -> __slots__ (truy cập nhanh hơn, không có __dict__)
+    __slots__ = (
+        'config', 'max_reconnect_attempts', 'reconnect_interval',
+        'health_check_interval', 'cache_ttl', 'io_timeout', 'heartbeat_ttl',
+        'on_state_change', 'on_error',
+        '_client', '_state', '_db_read', '_db_write', '_get_bool', '_set_bool',
+        '_reconnect_count', '_last_health_check', '_last_ok', '_enabled',
+        '_db_cache', '_db_limits', '_wr1', '_io_queue', '_io_thread', '_io_lock',
+    )
+    
+    # Kích thước 1 trang cache DB (byte)
+    CACHE_PAGE_SIZE = 64
+    
+    # Số biến tối đa trong 1 lệnh Read/WriteMultiVars của Snap7
+    MAX_MULTI_VARS = 20
+    
+    # Pool client dùng chung: {(ip, rack, slot): [client, refcount]}
+    _POOL: Dict[Tuple[str, int, int], list] = {}
+    _POOL_LOCK = threading.Lock()
+    
     def __init__(
         self,
         ip: str = "192.168.0.4",
@@ -85,6 +126,9 @@ class PLCClient:
         max_reconnect_attempts: int = 3,
         reconnect_interval: float = 1.0,
         health_check_interval: float = 10.0,
+        cache_ttl: float = 0.05,
+        io_timeout: float = 5.0,
+        heartbeat_ttl: float = 2.0,
         on_state_change: Optional[Callable[[PLCConnectionState], None]] = None,
         on_error: Optional[Callable[[str], None]] = None,
     ):
@@ -96,6 +140,10 @@ class PLCClient:
             max_reconnect_attempts: Số lần reconnect tối đa
             reconnect_interval: Thời gian chờ giữa các lần reconnect (giây)
             health_check_interval: Khoảng thời gian kiểm tra kết nối (giây)
+            cache_ttl: Thời gian sống của cache DB (giây), 0 = tắt cache
+            io_timeout: Thời gian chờ tối đa cho 1 lệnh đọc/ghi (giây)
+            heartbeat_ttl: Trong khoảng này (giây) kể từ lần đọc/ghi thành công
+                cuối, check_connection coi là còn kết nối mà không probe
             on_state_change: Callback khi trạng thái thay đổi
             on_error: Callback khi có lỗi
         """
@@ -103,16 +151,70 @@ class PLCClient:
         self.max_reconnect_attempts = max_reconnect_attempts
         self.reconnect_interval = reconnect_interval
         self.health_check_interval = health_check_interval
+        self.cache_ttl = cache_ttl
+        self.io_timeout = io_timeout
+        self.heartbeat_ttl = heartbeat_ttl
         self.on_state_change = on_state_change
         self.on_error = on_error
         
         # Internal state
         self._client = None
         self._state = PLCConnectionState.DISCONNECTED
-        self._lock = threading.Lock()
+        
+        # Hàm Snap7 bind sẵn sau khi connect (tránh tra thuộc tính mỗi lần đọc/ghi)
+        self._db_read: Optional[Callable] = None
+        self._db_write: Optional[Callable] = None
+        self._get_bool: Optional[Callable] = None
+        self._set_bool: Optional[Callable] = None
         self._reconnect_count = 0
-        self._last_health_check = 0.0
+        self._last_health_check = float('-inf')  # time.monotonic()
+        self._last_ok = 0.0  # time.monotonic() của lần đọc/ghi thành công cuối
         self._enabled = True
+        
+        # Cache DB: {(db_number, page_start): (timestamp, data)}
+        self._db_cache: Dict[Tuple[int, int], Tuple[float, bytearray]] = {}
+        # DB ngắn hơn 1 trang cache: {db_number: số byte đọc được đã biết}
+        self._db_limits: Dict[int, int] = {}
+        # Buffer 1 byte dùng lại cho write_byte (chỉ luồng I/O chạm vào,
+        # db_write copy dữ liệu ngay nên ghi đè lần sau là an toàn)
+        self._wr1 = bytearray(1)
+        
+        # Luồng I/O: chỉ luồng này được chạm vào self._client
+        self._io_queue: Optional[queue.SimpleQueue] = None
+        self._io_thread: Optional[threading.Thread] = None
+        self._io_lock = threading.Lock()
+    
+    @classmethod
+    def acquire(cls, ip: str, rack: int = 0, slot: int = 2, **kwargs) -> 'PLCClient':
+        """Lấy client dùng chung cho PLC (ip, rack, slot)
+        
+        Nhiều nơi cùng trỏ tới 1 PLC sẽ dùng chung 1 phiên S7 thay vì mỗi
+        nơi mở 1 kết nối riêng (CPU S7-300 chỉ có vài kết nối PG).
+        kwargs chỉ được dùng khi tạo client mới. Mỗi lần acquire phải đi kèm
+        1 lần release().
+        """
+        key = (ip, rack, slot)
+        with cls._POOL_LOCK:
+            entry = cls._POOL.get(key)
+            if entry is None:
+                entry = cls._POOL[key] = [cls(ip=ip, rack=rack, slot=slot, **kwargs), 0]
+            entry[1] += 1
+            return entry[0]
+    
+    @classmethod
+    def release(cls, client: 'PLCClient') -> None:
+        """Trả client đã acquire, ngắt kết nối khi không còn ai dùng"""
+        cfg = client.config
+        key = (cfg.ip, cfg.rack, cfg.slot)
+        with cls._POOL_LOCK:
+            entry = cls._POOL.get(key)
+            if entry is None or entry[0] is not client:
+                return
+            entry[1] -= 1
+            if entry[1] > 0:
+                return
+            del cls._POOL[key]
+        client.disconnect()
     
     @property
     def state(self) -> PLCConnectionState:
@@ -137,49 +239,13 @@ class PLCClient:
         if not self._enabled:
             return False
         
-        with self._lock:
-            self._set_state(PLCConnectionState.CONNECTING)
-            
-            try:
-                # Tạo client mới
-                if self._client is not None:
-                    try:
-                        self._client.disconnect()
-                    except:
-                        pass
-                
-                self._client = snap7.client.Client()
-                self._client.connect(
-                    self.config.ip, 
-                    self.config.rack, 
-                    self.config.slot
-                )
-                
-                if self._client.get_connected():
-                    self._set_state(PLCConnectionState.CONNECTED)
-                    self._reconnect_count = 0
-                    return True
-                else:
-                    self._set_state(PLCConnectionState.ERROR)
-                    self._report_error(f"Không thể kết nối PLC: {self.config}")
-                    return False
-                    
-            except Exception as e:
-                self._set_state(PLCConnectionState.ERROR)
-                self._report_error(f"Lỗi kết nối PLC: {str(e)}")
-                return False
+        # Snap7 tự có timeout khi connect, không giới hạn thêm ở đây
+        return self._call(self._do_connect, timeout=None, default=False)
     
     def disconnect(self) -> None:
         """Ngắt kết nối PLC"""
-        with self._lock:
-            if self._client is not None:
-                try:
-                    self._client.disconnect()
-                except:
-                    pass
-                self._client = None
-            
-            self._set_state(PLCConnectionState.DISCONNECTED)
+        self._call(self._do_disconnect, timeout=None)
+        self._stop_io_thread()
     
     def reconnect(self) -> bool:
         """Thử kết nối lại
@@ -195,13 +261,7 @@ class PLCClient:
         self._set_state(PLCConnectionState.RECONNECTING)
         
         # Đóng kết nối cũ
-        with self._lock:
-            if self._client is not None:
-                try:
-                    self._client.disconnect()
-                except:
-                    pass
-                self._client = None
+        self._call(self._do_close, timeout=None)
         
         time.sleep(self.reconnect_interval)
         
@@ -214,21 +274,12 @@ class PLCClient:
         Returns:
             True nếu đang kết nối
         """
-        with self._lock:
-            if self._client is None:
-                if self._state == PLCConnectionState.CONNECTED:
-                    self._set_state(PLCConnectionState.DISCONNECTED)
-                return False
-            
-            try:
-                connected = self._client.get_connected()
-                if not connected and self._state == PLCConnectionState.CONNECTED:
-                    self._set_state(PLCConnectionState.DISCONNECTED)
-                return connected
-            except:
-                if self._state == PLCConnectionState.CONNECTED:
-                    self._set_state(PLCConnectionState.ERROR)
-                return False
+        # Vừa đọc/ghi thành công -> chắc chắn còn kết nối, không cần probe
+        if (self._state == PLCConnectionState.CONNECTED
+                and time.monotonic() - self._last_ok < self.heartbeat_ttl):
+            return True
+        
+        return self._call(self._do_check_connection, default=False)
     
     def health_check(self) -> bool:
         """Kiểm tra sức khỏe kết nối định kỳ
@@ -236,24 +287,24 @@ class PLCClient:
         Returns:
             True nếu kết nối OK hoặc đã reconnect thành công
         """
-        current_time = time.time()
+        current_time = time.monotonic()
         
         if current_time - self._last_health_check < self.health_check_interval:
             return self.is_connected
         
         self._last_health_check = current_time
         
-        if not self.check_connection():
-            # Thử reconnect
-            if self._reconnect_count < self.max_reconnect_attempts:
-                return self.reconnect()
-            else:
-                # Reset counter sau một thời gian
-                if self._reconnect_count >= self.max_reconnect_attempts * 2:
-                    self._reconnect_count = 0
-                return False
+        # Vừa đọc/ghi thành công -> không cần probe
+        if (self._state == PLCConnectionState.CONNECTED
+                and current_time - self._last_ok < self.heartbeat_ttl):
+            return True
         
-        return True
+        # Probe + quyết định reconnect trong cùng 1 lệnh trên luồng I/O
+        connected, should_reconnect = self._call(self._do_health_probe, default=(False, False))
+        if should_reconnect:
+            # reconnect() tự đưa lệnh vào luồng I/O
+            return self.reconnect()
+        return connected
     
     def read_byte(self, db_number: int, byte_offset: int) -> Optional[int]:
         """Đọc 1 byte từ DB
@@ -268,14 +319,7 @@ class PLCClient:
         if not self.is_connected:
             return None
         
-        with self._lock:
-            try:
-                data = self._client.db_read(db_number, byte_offset, 1)
-                return data[0]
-            except Exception as e:
-                self._report_error(f"Lỗi đọc DB{db_number}.DBB{byte_offset}: {str(e)}")
-                self._set_state(PLCConnectionState.ERROR)
-                return None
+        return self._call(self._do_read_byte, db_number, byte_offset)
     
     def write_byte(self, db_number: int, byte_offset: int, value: int) -> bool:
         """Ghi 1 byte vào DB
@@ -291,15 +335,7 @@ class PLCClient:
         if not self.is_connected:
             return False
         
-        with self._lock:
-            try:
-                data = bytearray([value & 0xFF])
-                self._client.db_write(db_number, byte_offset, data)
-                return True
-            except Exception as e:
-                self._report_error(f"Lỗi ghi DB{db_number}.DBB{byte_offset}: {str(e)}")
-                self._set_state(PLCConnectionState.ERROR)
-                return False
+        return self._call(self._do_write_byte, db_number, byte_offset, value, default=False)
     
     def read_bit(self, db_number: int, byte_offset: int, bit_offset: int) -> Optional[bool]:
         """Đọc 1 bit từ DB
@@ -315,14 +351,7 @@ class PLCClient:
         if not self.is_connected or not SNAP7_AVAILABLE:
             return None
         
-        with self._lock:
-            try:
-                data = self._client.db_read(db_number, byte_offset, 1)
-                return get_bool(data, 0, bit_offset)
-            except Exception as e:
-                self._report_error(f"Lỗi đọc DB{db_number}.DBX{byte_offset}.{bit_offset}: {str(e)}")
-                self._set_state(PLCConnectionState.ERROR)
-                return None
+        return self._call(self._do_read_bit, db_number, byte_offset, bit_offset)
     
     def write_bit(self, db_number: int, byte_offset: int, 
                   bit_offset: int, value: bool) -> bool:
@@ -340,24 +369,473 @@ class PLCClient:
         if not self.is_connected or not SNAP7_AVAILABLE:
             return False
         
-        with self._lock:
+        return self._call(self._do_write_bit, db_number, byte_offset, bit_offset, value,
+                          default=False)
+    
+    def prefetch(self, db_number: int, byte_offset: int, size: int) -> bool:
+        """Nạp trước một vùng DB vào cache bằng 1 lần db_read
+        
+        Dùng trong vòng polling để các read_byte/read_bit tiếp theo
+        lấy dữ liệu từ cache thay vì mỗi lần một round trip.
+        
+        Args:
+            db_number: Số DB
+            byte_offset: Offset byte bắt đầu
+            size: Số byte cần nạp
+            
+        Returns:
+            True nếu thành công
+        """
+        if not self.is_connected:
+            return False
+        
+        return self._call(self._do_prefetch, db_number, byte_offset, size, default=False)
+    
+    def read_many(self, requests: List[Tuple[int, int, int]]) -> List[Optional[bytearray]]:
+        """Đọc nhiều vùng DB trong ít round trip nhất (ReadMultiVars)
+        
+        Args:
+            requests: Danh sách (db_number, byte_offset, length)
+            
+        Returns:
+            Danh sách dữ liệu theo đúng thứ tự requests, None cho vùng lỗi.
+            Biến lỗi riêng lẻ được báo qua on_error, không ngắt kết nối.
+        """
+        failed = [None] * len(requests)
+        if not requests or not self.is_connected:
+            return failed
+        
+        return self._call(self._do_read_many, list(requests), default=failed)
+    
+    def write_many(self, requests: List[Tuple[int, int, bytes]]) -> bool:
+        """Ghi nhiều vùng DB trong ít round trip nhất (WriteMultiVars)
+        
+        Args:
+            requests: Danh sách (db_number, byte_offset, data)
+            
+        Returns:
+            True nếu tất cả đều ghi thành công. Biến lỗi riêng lẻ (vd. vượt
+            kích thước DB) được báo qua on_error, không ngắt kết nối.
+        """
+        if not requests:
+            return True
+        if not self.is_connected:
+            return False
+        
+        return self._call(self._do_write_many, list(requests), default=False)
+    
+    # ==================== I/O thread ====================
+    
+    def _call(self, fn: Callable, *args, timeout: Optional[float] = -1, default=None):
+        """Đưa lệnh vào hàng đợi của luồng I/O và chờ kết quả
+        
+        Args:
+            fn: Hàm _do_* cần chạy trên luồng I/O
+            timeout: Thời gian chờ (giây), -1 = io_timeout, None = chờ mãi
+            default: Giá trị trả về nếu hết thời gian chờ
+        """
+        # Đang ở trên luồng I/O (vd. callback gọi lại) -> chạy trực tiếp
+        if getattr(threading.current_thread(), '_plc_owner', None) is self:
+            return fn(*args)
+        
+        fut = Future()
+        with self._io_lock:
+            if self._io_thread is None:
+                self._io_queue = queue.SimpleQueue()
+                self._io_thread = threading.Thread(
+                    target=self._io_loop,
+                    args=(self._io_queue,),
+                    name=f"PLC-IO-{self.config.ip}",
+                    daemon=True
+                )
+                self._io_thread._plc_owner = self
+                self._io_thread.start()
+            self._io_queue.put((fn, args, fut))
+        
+        if timeout == -1:
+            timeout = self.io_timeout
+        try:
+            return fut.result(timeout=timeout)
+        except FutureTimeoutError:
+            self._report_error(f"PLC {self.config.ip}: hết thời gian chờ ({timeout}s)")
+            return default
+    
+    def _io_loop(self, q: queue.SimpleQueue) -> None:
+        """Vòng lặp của luồng I/O: thực thi tuần tự từng lệnh Snap7"""
+        while True:
+            item = q.get()
+            if item is None:
+                return
+            fn, args, fut = item
+            if not fut.set_running_or_notify_cancel():
+                continue
             try:
-                # Đọc byte hiện tại
-                data = self._client.db_read(db_number, byte_offset, 1)
-                # Thiết lập bit
-                set_bool(data, 0, bit_offset, value)
-                # Ghi lại
-                self._client.db_write(db_number, byte_offset, data)
+                fut.set_result(fn(*args))
+            except BaseException as e:
+                fut.set_exception(e)
+    
+    def _stop_io_thread(self) -> None:
+        """Dừng luồng I/O sau khi xử lý hết các lệnh đang chờ"""
+        if getattr(threading.current_thread(), '_plc_owner', None) is self:
+            return
+        
+        with self._io_lock:
+            thread = self._io_thread
+            if thread is None:
+                return
+            self._io_queue.put(None)
+            # Giữ _io_lock khi join để không có luồng I/O mới chạy song song
+            thread.join()
+            self._io_thread = None
+            self._io_queue = None
+    
+    # ==================== Snap7 operations (chạy trên luồng I/O) ====================
+    
+    def _do_connect(self) -> bool:
+        self._set_state(PLCConnectionState.CONNECTING)
+        
+        try:
+            # Tạo client mới
+            if self._client is not None:
+                try:
+                    self._client.disconnect()
+                except:
+                    pass
+            self._unbind_client()
+            self._db_cache.clear()
+            self._db_limits.clear()
+            
+            self._client = snap7.client.Client()
+            self._client.connect(
+                self.config.ip, 
+                self.config.rack, 
+                self.config.slot
+            )
+            
+            if self._client.get_connected():
+                self._bind_client()
+                self._set_state(PLCConnectionState.CONNECTED)
+                self._reconnect_count = 0
+                self._last_ok = time.monotonic()
                 return True
-            except Exception as e:
-                self._report_error(f"Lỗi ghi DB{db_number}.DBX{byte_offset}.{bit_offset}: {str(e)}")
+            else:
                 self._set_state(PLCConnectionState.ERROR)
+                self._report_error(f"Không thể kết nối PLC: {self.config}")
                 return False
+                
+        except Exception as e:
+            self._set_state(PLCConnectionState.ERROR)
+            self._report_error(f"Lỗi kết nối PLC: {str(e)}")
+            return False
+    
+    def _do_close(self) -> None:
+        if self._client is not None:
+            try:
+                self._client.disconnect()
+            except:
+                pass
+            self._client = None
+        self._unbind_client()
+        self._db_cache.clear()
+        self._db_limits.clear()
+    
+    def _bind_client(self) -> None:
+        """Bind sẵn các hàm Snap7 của client hiện tại"""
+        self._db_read = self._client.db_read
+        self._db_write = self._client.db_write
+        self._get_bool = get_bool
+        self._set_bool = set_bool
+    
+    def _unbind_client(self) -> None:
+        self._db_read = None
+        self._db_write = None
+        self._get_bool = None
+        self._set_bool = None
+    
+    def _do_disconnect(self) -> None:
+        self._do_close()
+        self._set_state(PLCConnectionState.DISCONNECTED)
+    
+    def _do_check_connection(self) -> bool:
+        if self._client is None:
+            if self._state == PLCConnectionState.CONNECTED:
+                self._set_state(PLCConnectionState.DISCONNECTED)
+            return False
+        
+        try:
+            connected = self._client.get_connected()
+            if not connected and self._state == PLCConnectionState.CONNECTED:
+                self._set_state(PLCConnectionState.DISCONNECTED)
+            return connected
+        except:
+            if self._state == PLCConnectionState.CONNECTED:
+                self._set_state(PLCConnectionState.ERROR)
+            return False
+    
+    def _do_health_probe(self) -> Tuple[bool, bool]:
+        """Trả về (đang kết nối, có nên reconnect)"""
+        if self._do_check_connection():
+            return True, False
+        
+        if self._reconnect_count < self.max_reconnect_attempts:
+            return False, True
+        
+        # Reset counter sau một thời gian
+        if self._reconnect_count >= self.max_reconnect_attempts * 2:
+            self._reconnect_count = 0
+        return False, False
+    
+    def _do_read_byte(self, db_number: int, byte_offset: int) -> Optional[int]:
+        data, err = self._safe(self._read_db_region, db_number, byte_offset, 1)
+        if err is not None:
+            self._op_failed(err, "Lỗi đọc DB%d.DBB%d", db_number, byte_offset)
+            return None
+        return data[0]
+    
+    def _do_write_byte(self, db_number: int, byte_offset: int, value: int) -> bool:
+        _, err = self._safe(self._write_byte_raw, db_number, byte_offset, value)
+        if err is not None:
+            self._op_failed(err, "Lỗi ghi DB%d.DBB%d", db_number, byte_offset)
+            return False
+        return True
+    
+    def _do_read_bit(self, db_number: int, byte_offset: int, bit_offset: int) -> Optional[bool]:
+        data, err = self._safe(self._read_db_region, db_number, byte_offset, 1)
+        if err is not None:
+            self._op_failed(err, "Lỗi đọc DB%d.DBX%d.%d", db_number, byte_offset, bit_offset)
+            return None
+        return self._get_bool(data, 0, bit_offset)
+    
+    def _do_write_bit(self, db_number: int, byte_offset: int,
+                      bit_offset: int, value: bool) -> bool:
+        _, err = self._safe(self._write_bit_raw, db_number, byte_offset, bit_offset, value)
+        if err is not None:
+            self._op_failed(err, "Lỗi ghi DB%d.DBX%d.%d", db_number, byte_offset, bit_offset)
+            return False
+        return True
+    
+    def _do_prefetch(self, db_number: int, byte_offset: int, size: int) -> bool:
+        _, err = self._safe(self._read_db_region, db_number, byte_offset, size)
+        if err is not None:
+            self._op_failed(err, "Lỗi đọc DB%d.DBB%d (%d bytes)", db_number, byte_offset, size)
+            return False
+        return True
+    
+    def _do_read_many(self, requests: List[Tuple[int, int, int]]) -> List[Optional[bytearray]]:
+        if not MULTI_VARS_AVAILABLE:
+            return [self._read_region_or_none(*req) for req in requests]
+        
+        results: List[Optional[bytearray]] = []
+        step = self.MAX_MULTI_VARS
+        for i in range(0, len(requests), step):
+            chunk = requests[i:i + step]
+            data, err = self._safe(self._read_multi_raw, chunk)
+            if err is not None:
+                self._op_failed(err, "Lỗi đọc %d biến DB", len(chunk))
+                return results + [None] * (len(requests) - len(results))
+            items, data = data
+            self._report_item_errors(items, "đọc")
+            results += data
+        return results
+    
+    def _read_region_or_none(self, db_number: int, byte_offset: int,
+                            size: int) -> Optional[bytearray]:
+        data, err = self._safe(self._read_db_region, db_number, byte_offset, size)
+        if err is not None:
+            self._var_failed(err, "Lỗi đọc DB%d.DBB%d (%d bytes)", db_number, byte_offset, size)
+            return None
+        return data
+    
+    def _do_write_many(self, requests: List[Tuple[int, int, bytes]]) -> bool:
+        if not MULTI_VARS_AVAILABLE or not hasattr(self._client, 'write_multi_vars'):
+            # Ghi từng vùng bằng db_write
+            ok = True
+            for db_number, byte_offset, data in requests:
+                _, err = self._safe(self._db_write, db_number, byte_offset, bytearray(data))
+                if err is not None:
+                    if not self._var_failed(err, "Lỗi ghi DB%d.DBB%d", db_number, byte_offset):
+                        return False
+                    ok = False
+                    continue
+                self._invalidate_region(db_number, byte_offset, len(data))
+                self._last_ok = time.monotonic()
+            return ok
+        
+        ok = True
+        step = self.MAX_MULTI_VARS
+        for i in range(0, len(requests), step):
+            chunk = requests[i:i + step]
+            items, err = self._safe(self._write_multi_raw, chunk)
+            if err is not None:
+                self._op_failed(err, "Lỗi ghi %d biến DB", len(chunk))
+                return False
+            if self._report_item_errors(items, "ghi"):
+                ok = False
+        return ok
+    
+    @staticmethod
+    def _make_items(chunk: list, buffers: list) -> ctypes.Array:
+        """Tạo mảng S7DataItem trỏ vào buffers (giữ buffers sống đến hết lệnh)"""
+        items = (S7DataItem * len(chunk))()
+        for item, (db_number, byte_offset, _), buf in zip(items, chunk, buffers):
+            item.Area = S7AreaDB
+            item.WordLen = S7WLByte
+            item.DBNumber = db_number
+            item.Start = byte_offset
+            item.Amount = len(buf)
+            item.pData = ctypes.cast(buf, ctypes.POINTER(ctypes.c_uint8))
+        return items
+    
+    def _report_item_errors(self, items: ctypes.Array, action: str) -> bool:
+        """Báo các biến có Result != 0 (vd. vượt kích thước DB) - chỉ báo lỗi,
+        không đổi trạng thái kết nối. Trả về True nếu có biến lỗi."""
+        failed = False
+        for item in items:
+            if item.Result != 0:
+                failed = True
+                if self.on_error is not None:
+                    self._report_error(
+                        f"Lỗi {action} DB{item.DBNumber}.DBB{item.Start} "
+                        f"({item.Amount} bytes): mã lỗi 0x{item.Result:X}")
+        return failed
+    
+    def _read_multi_raw(self, chunk: List[Tuple[int, int, int]]
+                        ) -> Tuple[ctypes.Array, List[Optional[bytearray]]]:
+        buffers = [(ctypes.c_uint8 * length)() for _, _, length in chunk]
+        items = self._make_items(chunk, buffers)
+        self._client.read_multi_vars(items)
+        self._last_ok = time.monotonic()
+        # Result != 0: biến đó lỗi -> None
+        return items, [bytearray(buf) if item.Result == 0 else None
+                       for item, buf in zip(items, buffers)]
+    
+    def _write_multi_raw(self, chunk: List[Tuple[int, int, bytes]]) -> ctypes.Array:
+        buffers = [(ctypes.c_uint8 * len(data)).from_buffer_copy(data) for _, _, data in chunk]
+        items = self._make_items(chunk, buffers)
+        self._client.write_multi_vars(list(items))
+        self._last_ok = time.monotonic()
+        for db_number, byte_offset, data in chunk:
+            self._invalidate_region(db_number, byte_offset, len(data))
+        # Result từng biến (bản python-snap7 nào trả về thì có, còn lại giữ 0)
+        return items
+    
+    def _write_byte_raw(self, db_number: int, byte_offset: int, value: int) -> None:
+        data = self._wr1
+        data[0] = value & 0xFF
+        self._db_write(db_number, byte_offset, data)
+        self._last_ok = time.monotonic()
+        self._invalidate_cache(db_number, byte_offset)
+    
+    def _write_bit_raw(self, db_number: int, byte_offset: int,
+                       bit_offset: int, value: bool) -> None:
+        # Đọc byte hiện tại
+        data = self._db_read(db_number, byte_offset, 1)
+        # Thiết lập bit
+        self._set_bool(data, 0, bit_offset, value)
+        # Ghi lại
+        self._db_write(db_number, byte_offset, data)
+        self._last_ok = time.monotonic()
+        self._invalidate_cache(db_number, byte_offset)
+    
+    @staticmethod
+    def _safe(fn: Callable, *args) -> Tuple[object, Optional[Exception]]:
+        """Gọi lệnh Snap7, trả về (kết quả, None) hoặc (None, lỗi)"""
+        try:
+            return fn(*args), None
+        except Exception as e:
+            return None, e
+    
+    @staticmethod
+    def _out_of_range(err: Exception) -> bool:
+        """Lỗi Snap7 do đọc vượt kích thước DB (không phải lỗi kết nối)"""
+        return "address out of range" in str(err).lower()
+    
+    def _var_failed(self, err: Exception, fmt: str, *args) -> bool:
+        """Lỗi khi đọc/ghi 1 biến trong lô: vượt kích thước DB chỉ báo lỗi
+        biến đó (trả về True), lỗi khác coi là lỗi kết nối (_op_failed)"""
+        if self._out_of_range(err):
+            if self.on_error is not None:
+                self._report_error(f"{fmt % args}: {err}")
+            return True
+        self._op_failed(err, fmt, *args)
+        return False
+    
+    def _op_failed(self, err: Exception, fmt: str, *args) -> None:
+        """Xử lý lỗi đọc/ghi: chỉ format thông báo khi có on_error"""
+        if self.on_error is not None:
+            self._report_error(f"{fmt % args}: {err}")
+        self._set_state(PLCConnectionState.ERROR)
+    
+    def _read_db_region(self, db_number: int, byte_offset: int, size: int) -> bytearray:
+        """Đọc vùng DB qua cache theo trang (chạy trên luồng I/O)
+        
+        Mỗi trang CACHE_PAGE_SIZE byte được nạp bằng 1 lần db_read và
+        dùng lại cho đến khi hết cache_ttl. Nếu trang vượt quá kích thước
+        DB (PLC báo address out of range), đọc lại trang chỉ đến hết vùng
+        yêu cầu và nhớ giới hạn đó cho DB để lần sau chỉ mất 1 round trip.
+        Lỗi kết nối được ném ra ngay, không thử lại.
+        """
+        if self.cache_ttl <= 0:
+            data = self._db_read(db_number, byte_offset, size)
+            self._last_ok = time.monotonic()
+            return data
+        
+        page_size = self.CACHE_PAGE_SIZE
+        first_page = byte_offset - byte_offset % page_size
+        end = byte_offset + size
+        now = time.monotonic()
+        
+        limit = self._db_limits.get(db_number)
+        result = bytearray()
+        page_start = first_page
+        while page_start < end:
+            key = (db_number, page_start)
+            need = min(page_size, end - page_start)
+            cached = self._db_cache.get(key)
+            if cached is None or now - cached[0] >= self.cache_ttl or len(cached[1]) < need:
+                length = page_size
+                if limit is not None and limit < page_start + page_size:
+                    # DB ngắn hơn trang -> chỉ đọc đến giới hạn đã biết (hoặc hết vùng cần)
+                    length = max(limit - page_start, need)
+                try:
+                    page = self._db_read(db_number, page_start, length)
+                except Exception as e:
+                    if length == need or not self._out_of_range(e):
+                        raise
+                    # Trang vượt quá kích thước DB -> đọc đến hết vùng cần
+                    length = need
+                    page = self._db_read(db_number, page_start, length)
+                if length < page_size or limit is not None:
+                    limit = self._db_limits[db_number] = max(limit or 0, page_start + length)
+                self._db_cache[key] = (now, page)
+                self._last_ok = now
+            else:
+                page = cached[1]
+            result += page
+            page_start += page_size
+        
+        start = byte_offset - first_page
+        return result[start:start + size]
+    
+    def _invalidate_cache(self, db_number: int, byte_offset: int) -> None:
+        """Xóa trang cache chứa byte vừa ghi (tránh đọc dữ liệu cũ)"""
+        page_start = byte_offset - byte_offset % self.CACHE_PAGE_SIZE
+        self._db_cache.pop((db_number, page_start), None)
+    
+    def _invalidate_region(self, db_number: int, byte_offset: int, size: int) -> None:
+        """Xóa mọi trang cache giao với vùng vừa ghi"""
+        page_size = self.CACHE_PAGE_SIZE
+        page_start = byte_offset - byte_offset % page_size
+        while page_start < byte_offset + size:
+            self._db_cache.pop((db_number, page_start), None)
+            page_start += page_size
     
     def _set_state(self, new_state: PLCConnectionState) -> None:
         """Cập nhật trạng thái và gọi callback"""
         if self._state != new_state:
             self._state = new_state
+            if new_state != PLCConnectionState.CONNECTED:
+                self._last_ok = 0.0
             if self.on_state_change:
                 try:
                     self.on_state_change(new_state)
@@ -1,130 +1,268 @@
 """
 Test VRAM peak usage khi 2 models chạy song song liên tục
+
+Mỗi model chạy trong 1 process riêng (CUDA context riêng) để phần
+xử lý Python của ultralytics không tranh chấp GIL giữa 2 model.
 """
-import threading
+import os
+import sys
+import signal
+import multiprocessing as mp
 import time
 import cv2
 import numpy as np
+import torch
+
+try:
+    import pynvml
+    pynvml.nvmlInit()
+    _NVML_HANDLE = pynvml.nvmlDeviceGetHandleByIndex(0)
+    NVML_AVAILABLE = True
+except Exception:
+    NVML_AVAILABLE = False
 
 # Đường dẫn models
 MODEL_1_PATH = r"D:\research2025\than_muc\best_segment_26_11.pt"
 MODEL_2_PATH = r"D:\research2025\than_muc\best_segment_27_11_copy.pt"
 
+MB = 1024 * 1024
+
+# Chế độ inference
+HALF = True             # FP16 (giảm VRAM activation, dùng tensor core)
+USE_TENSORRT = False    # Export TensorRT engine 1 lần rồi load lại (.engine cạnh file .pt)
+
 def get_gpu_memory():
-    """Lấy VRAM usage từ nvidia-smi"""
+    """Lấy VRAM usage (MB) qua NVML, fallback nvidia-smi nếu không có pynvml"""
+    if NVML_AVAILABLE:
+        return pynvml.nvmlDeviceGetMemoryInfo(_NVML_HANDLE).used // MB
+    
     import subprocess
     result = subprocess.run(
         ['nvidia-smi', '--query-gpu=memory.used', '--format=csv,noheader,nounits'],
         capture_output=True, text=True
     )
-    return int(result.stdout.strip())
+    return int(result.stdout.strip().splitlines()[0])
+
+def make_input_tensor(frame, imgsz=640, stride=32):
+    """Tiền xử lý frame 1 lần và đưa lên GPU
+    
+    Làm giống letterbox của ultralytics (resize giữ tỷ lệ, pad 114 về bội
+    số của stride, BGR->RGB, HWC->NCHW, /255) để workload giữ nguyên như
+    khi truyền numpy, nhưng không phải copy host->device mỗi lần predict.
+    Engine TensorRT export với imgsz cố định (vuông) nên khi USE_TENSORRT
+    thì pad đủ imgsz x imgsz thay vì bội số của stride.
+    """
+    h, w = frame.shape[:2]
+    r = imgsz / max(h, w)
+    new_w, new_h = round(w * r), round(h * r)
+    if USE_TENSORRT:
+        pad_w, pad_h = imgsz - new_w, imgsz - new_h
+    else:
+        pad_w = (stride - new_w % stride) % stride
+        pad_h = (stride - new_h % stride) % stride
+    
+    img = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    img = cv2.copyMakeBorder(
+        img, pad_h // 2, pad_h - pad_h // 2, pad_w // 2, pad_w - pad_w // 2,
+        cv2.BORDER_CONSTANT, value=(114, 114, 114)
+    )
+    img = np.ascontiguousarray(img[..., ::-1])  # BGR -> RGB
+    
+    tensor = torch.from_numpy(img).to('cuda').permute(2, 0, 1).unsqueeze(0)
+    return tensor.float().div_(255).contiguous()
+
+def load_model(path):
+    """Load model theo chế độ HALF / USE_TENSORRT"""
+    from ultralytics import YOLO
+    
+    if not USE_TENSORRT:
+        return YOLO(path)
+    
+    engine_path = os.path.splitext(path)[0] + ".engine"
+    if not os.path.exists(engine_path):
+        print(f"    Build TensorRT engine (1 lan): {engine_path}")
+        YOLO(path).export(format='engine', half=HALF, imgsz=640, device=0)
+    return YOLO(engine_path, task='segment')
 
-def predict_loop(model, model_name, frame, stop_event, results):
-    """Loop predict liên tục"""
+def predict_loop(predictor, model_name, frame, stop_event, stream=None):
+    """Loop predict liên tục
+    
+    Gọi thẳng predictor đã dựng sẵn lúc warmup (không parse lại kwargs
+    của model.predict mỗi vòng). Mỗi model chạy trên CUDA stream riêng.
+    
+    Returns:
+        Số lần inference
+    """
     count = 0
-    start = time.time()
+    start_ns = time.monotonic_ns()
+    write = sys.stdout.write
+    flush = sys.stdout.flush
     
     while not stop_event.is_set():
-        _ = model.predict(frame, conf=0.7, verbose=False, task='segment')
+        with torch.cuda.stream(stream):
+            _ = predictor(source=frame)
         count += 1
         
-        if count % 10 == 0:
-            elapsed = time.time() - start
-            fps = count / elapsed
-            print(f"  {model_name}: {count} inferences, {fps:.1f} FPS")
+        # Log moi 64 lan: it I/O stdout trong vong lap do FPS
+        if (count & 63) == 0:
+            fps = count * 1e9 / (time.monotonic_ns() - start_ns)
+            write("  %s: %d inferences, %.1f FPS\n" % (model_name, count, fps))
+            flush()
     
-    results[model_name] = count
+    return count
 
-def main():
-    print("=" * 60)
-    print("  TEST VRAM PEAK - 2 MODELS SONG SONG")
-    print("=" * 60)
+def model_worker(model_path, model_name, seed, ready_event, start_event, stop_event, results):
+    """Process con: load 1 model, warmup, chờ lệnh rồi predict liên tục"""
+    # Ctrl+C do process cha xử lý (set stop_event)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
     
-    # Kiem tra VRAM ban dau
-    initial_vram = get_gpu_memory()
-    print(f"\n[0] VRAM ban dau: {initial_vram} MB")
+    model = load_model(model_path)
     
-    # Import va load models
-    print("\n[1] Loading models...")
-    from ultralytics import YOLO
+    # Fake frame 1920x1080 tu seed co dinh -> workload giong nhau giua cac lan chay
+    frame = np.random.default_rng(seed).integers(0, 255, (1080, 1920, 3), dtype=np.uint8)
+    # Frame khong doi -> tien xu ly va upload len GPU 1 lan duy nhat
+    frame = make_input_tensor(frame)
     
-    model1 = YOLO(MODEL_1_PATH)
-    vram_after_model1 = get_gpu_memory()
-    print(f"    Sau load Model 1: {vram_after_model1} MB (+{vram_after_model1 - initial_vram} MB)")
+    # Warmup: predictor duoc dung voi overrides (conf, half, ...) o day
+    _ = model.predict(frame, conf=0.7, verbose=False, task='segment', half=HALF, device=0)
+    predictor = model.predictor
+    stream = torch.cuda.Stream()
     
-    model2 = YOLO(MODEL_2_PATH)
-    vram_after_model2 = get_gpu_memory()
-    print(f"    Sau load Model 2: {vram_after_model2} MB (+{vram_after_model2 - vram_after_model1} MB)")
+    torch.cuda.synchronize()
+    reserved_warmup = torch.cuda.memory_reserved() // MB
+    torch.cuda.reset_peak_memory_stats()
     
-    # Tao fake frame (1920x1080)
-    print("\n[2] Tao test frame 1920x1080...")
-    frame = np.random.randint(0, 255, (1080, 1920, 3), dtype=np.uint8)
+    ready_event.set()
+    start_event.wait()
     
-    # Warmup
-    print("\n[3] Warmup (1 inference mỗi model)...")
-    _ = model1.predict(frame, conf=0.7, verbose=False, task='segment')
-    _ = model2.predict(frame, conf=0.7, verbose=False, task='segment')
-    vram_after_warmup = get_gpu_memory()
-    print(f"    Sau warmup: {vram_after_warmup} MB")
+    count = predict_loop(predictor, model_name, frame, stop_event, stream)
     
-    # Chay song song
-    print("\n[4] Chay 2 models SONG SONG trong 10 giay...")
-    print("    (Ctrl+C de dung som)\n")
+    torch.cuda.synchronize()
+    results[model_name] = {
+        "count": count,
+        "reserved_warmup": reserved_warmup,
+        "peak_allocated": torch.cuda.max_memory_allocated() // MB,
+        "peak_reserved": torch.cuda.max_memory_reserved() // MB,
+    }
+
+def stop_processes(processes, start_event, stop_event, timeout=30.0):
+    """Bao cac process con dung, join co timeout, terminate neu van treo"""
+    stop_event.set()
+    start_event.set()
+    for proc in processes:
+        proc.join(timeout)
+        if proc.is_alive():
+            print(f"  {proc.name}: khong dung sau {timeout:.0f}s, terminate")
+            proc.terminate()
+            proc.join(5)
+
+def main():
+    print("=" * 60)
+    print("  TEST VRAM PEAK - 2 MODELS SONG SONG (2 PROCESS)")
+    print("=" * 60)
     
-    stop_event = threading.Event()
-    results = {}
+    # CUDA khong dung duoc voi fork
+    ctx = mp.get_context("spawn")
+    manager = ctx.Manager()
+    results = manager.dict()
+    start_event = ctx.Event()
+    stop_event = ctx.Event()
     
-    thread1 = threading.Thread(
-        target=predict_loop, 
-        args=(model1, "Model 1", frame, stop_event, results)
-    )
-    thread2 = threading.Thread(
-        target=predict_loop, 
-        args=(model2, "Model 2", frame, stop_event, results)
-    )
+    # Kiem tra VRAM ban dau
+    initial_vram = get_gpu_memory()
+    print(f"\n[0] VRAM ban dau: {initial_vram} MB")
     
-    # Bat dau
-    thread1.start()
-    thread2.start()
+    # Load + warmup tung model trong process rieng
+    mode = ("TensorRT " if USE_TENSORRT else "") + ("FP16" if HALF else "FP32")
+    print(f"\n[1] Loading + warmup models ({mode}), moi model 1 process...")
     
-    # Monitor VRAM trong 10 giay
-    peak_vram = vram_after_warmup
+    processes = []
+    vram_steps = []
+    prev_vram = initial_vram
     try:
-        for i in range(20):  # 10 giay (20 x 0.5s)
-            time.sleep(0.5)
-            current_vram = get_gpu_memory()
-            if current_vram > peak_vram:
-                peak_vram = current_vram
-            print(f"  [VRAM] Current: {current_vram} MB | Peak: {peak_vram} MB")
-    except KeyboardInterrupt:
-        print("\n  Dung boi user...")
-    
-    # Dung threads
-    stop_event.set()
-    thread1.join()
-    thread2.join()
+        for seed, (path, name) in enumerate([(MODEL_1_PATH, "Model 1"), (MODEL_2_PATH, "Model 2")]):
+            ready_event = ctx.Event()
+            proc = ctx.Process(
+                target=model_worker,
+                args=(path, name, seed, ready_event, start_event, stop_event, results),
+                name=name,
+            )
+            proc.start()
+            processes.append(proc)
+            
+            while not ready_event.wait(0.5):
+                if not proc.is_alive():
+                    raise RuntimeError(f"{name}: process ket thuc truoc khi warmup xong")
+            
+            vram = get_gpu_memory()
+            vram_steps.append((name, vram, vram - prev_vram))
+            print(f"    Sau load + warmup {name}: {vram} MB (+{vram - prev_vram} MB)")
+            prev_vram = vram
+        
+        vram_after_warmup = prev_vram
+        
+        # Chay song song
+        print("\n[2] Chay 2 models SONG SONG trong 10 giay...")
+        print("    (Ctrl+C de dung som)\n")
+        start_event.set()
+        
+        # Chay 10 giay. TensorRT cap phat bo nho engine ngoai allocator cua
+        # torch -> lay mau NVML ca giai doan chay de co peak that
+        nvml_peak = vram_after_warmup
+        deadline = time.monotonic() + 10
+        try:
+            while (remaining := deadline - time.monotonic()) > 0:
+                if USE_TENSORRT:
+                    nvml_peak = max(nvml_peak, get_gpu_memory())
+                    time.sleep(min(0.1, remaining))
+                else:
+                    time.sleep(remaining)
+        except KeyboardInterrupt:
+            print("\n  Dung boi user...")
+    finally:
+        # Luon dung process con (ke ca khi Ctrl+C / loi luc load): con dang
+        # cho start_event se thoat ngay vi stop_event da set
+        stop_processes(processes, start_event, stop_event)
     
-    # Ket qua
+    # Ket qua: peak moi process = NVML luc warmup + phan tang them cua allocator
+    # torch; TensorRT thi lay them peak NVML lay mau (gom bo nho engine)
+    stats = dict(results)
+    peak_vram = vram_after_warmup + sum(
+        r["peak_reserved"] - r["reserved_warmup"] for r in stats.values()
+    )
+    if USE_TENSORRT:
+        peak_vram = max(peak_vram, nvml_peak)
+        peak_source = "NVML lay mau khi chay"
+    else:
+        peak_source = "NVML warmup + torch allocator"
     final_vram = get_gpu_memory()
     
     print("\n" + "=" * 60)
     print("  KET QUA TEST VRAM")
     print("=" * 60)
+    
+    lines = [f"    Ban dau (truoc load):         {initial_vram:6} MB"]
+    for name, vram, delta in vram_steps:
+        lines.append(f"    Sau load + warmup {name}:   {vram:6} MB (+{delta} MB)")
+    lines.append("    -------------------------------------------")
+    for name, r in stats.items():
+        lines.append(f"    {name}: {r['count']} inferences, "
+                     f"peak allocated {r['peak_allocated']} MB, "
+                     f"peak reserved {r['peak_reserved']} MB")
+    
     print(f"""
-    VRAM USAGE:
+    VRAM USAGE ({mode}):
     -------------------------------------------
-    Ban dau (truoc load):         {initial_vram:6} MB
-    Sau load Model 1:             {vram_after_model1:6} MB (+{vram_after_model1-initial_vram} MB)
-    Sau load Model 2:             {vram_after_model2:6} MB (+{vram_after_model2-vram_after_model1} MB)
-    Sau warmup:                   {vram_after_warmup:6} MB
+{chr(10).join(lines)}
     -------------------------------------------
-    PEAK (2 models song song):    {peak_vram:6} MB
+    PEAK (2 models song song):    {peak_vram:6} MB  ({peak_source})
     Final:                        {final_vram:6} MB
     -------------------------------------------
     TONG VRAM CAN:                {peak_vram:6} MB
     % cua 8GB:                    {peak_vram/8192*100:6.1f} %
     """)
+    
+    manager.shutdown()
 
 if __name__ == "__main__":
     main()
-
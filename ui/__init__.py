@@ -10,9 +10,31 @@ Public API:
 - ROIEditor: Vẽ ROI trực quan trên video
 """
 
-from .main_window import MainWindow
-from .config_panel import ConfigPanel
-from .roi_editor import ROIEditor, open_roi_editor
+import importlib
+
+# Import lười (PEP 562): chỉ load module GUI (tkinter, cv2, PIL...) khi
+# thực sự truy cập tên tương ứng
+_LAZY_ATTRS = {
+    'MainWindow': 'main_window',
+    'ConfigPanel': 'config_panel',
+    'ROIEditor': 'roi_editor',
+    'open_roi_editor': 'roi_editor',
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(f'.{module_name}', __name__)
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRS))
+
 
 __all__ = [
     'MainWindow',
@@ -13,10 +13,292 @@ Cho phép:
 
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, simpledialog
+import tkinter.font as tkfont
+import hashlib
 import json
 import os
-from typing import Optional, Callable, List, Tuple
+from typing import Optional, Callable, Dict, List, Tuple
 import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+from ..config import SystemConfig
+
+
+# Phiên bản schema của từng phần trong file xuất (backup)
+_SECTION_VERSIONS = {"cameras": 1, "models": 1}
+
+
+def _json_dumps(obj) -> bytes:
+    """Serialize config ra bytes JSON (orjson nếu có)"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, default=_config_default, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=4, ensure_ascii=False,
+                      default=_config_default).encode('utf-8')
+
+
+def _config_default(obj):
+    """Encoder cho kiểu orjson/json không tự xử lý (vd. set, Path)"""
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj)
+    if isinstance(obj, os.PathLike):
+        return os.fspath(obj)
+    raise TypeError(f"Type {type(obj).__name__} is not JSON serializable")
+
+
+def _json_loads(data: bytes):
+    """Parse bytes JSON (orjson nếu có)"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data.decode('utf-8'))
+
+
+# Proc Tcl insert nhiều dòng vào Treeview trong 1 lần gọi từ Python
+_TREE_FILL_PROC = '::cfgpanel_tree_fill'
+_TREE_FILL_SCRIPT = """
+proc %s {w rows} {
+    foreach row $rows {
+        lassign $row iid values
+        $w insert {} end -id $iid -values $values
+    }
+}
+""" % _TREE_FILL_PROC
+
+
+# Schema form camera: (khóa trong mảng Tcl, thuộc tính của CameraConfig, giá trị mặc định)
+_CAM_FIELDS = (
+    ('name', 'name', ""),
+    ('rtsp', 'rtsp_url', ""),
+    ('plc_ip', 'plc.ip', ""),
+    ('plc_db', 'plc.db_number', "300"),
+    ('person_byte', 'plc.person_alarm_byte', "6"),
+    ('person_bit', 'plc.person_alarm_bit', "0"),
+    ('coal_byte', 'plc.coal_alarm_byte', "6"),
+    ('coal_bit', 'plc.coal_alarm_bit', "1"),
+)
+
+
+# Các Scale của tab Phát hiện:
+# (nhãn, khóa trong _det_vars, từ, đến, độ dài, độ rộng nhãn, mặc định)
+_DET_SCALES = (
+    ("Ngưỡng tin cậy (%):", 'confidence', 10, 100, 300, 25, 70),
+    ("Số frame liên tiếp BẬT cảnh báo người:", 'person_on', 1, 20, 200, 35, 3),
+    ("Số frame để TẮT cảnh báo người:", 'person_off', 1, 20, 200, 35, 5),
+    ("Ngưỡng tỷ lệ than (%):", 'coal_ratio', 30, 100, 300, 25, 73),
+    ("Số frame liên tiếp BẬT cảnh báo than:", 'coal_on', 1, 50, 200, 35, 5),
+)
+
+# Khóa _det_vars -> (thuộc tính DetectionConfig, config -> giá trị Scale, giá trị Scale -> config)
+_DET_FIELDS = (
+    ('confidence', 'confidence_threshold', lambda v: int(round(v * 100)), lambda v: v / 100.0),
+    ('person_on', 'person_consecutive_threshold', int, int),
+    ('person_off', 'person_no_detection_threshold', int, int),
+    ('coal_ratio', 'coal_ratio_threshold', lambda v: int(round(v)), float),
+    ('coal_on', 'coal_consecutive_threshold', int, int),
+)
+
+
+def _build_apply_camera(fields) -> Callable:
+    """Sinh hàm _apply_camera(self, cam) từ schema
+    
+    Hàm sinh ra truy cập thẳng cam.<thuộc tính> (không getattr/vòng lặp)
+    và đẩy toàn bộ giá trị vào mảng Tcl của form bằng 1 lệnh "array set".
+    """
+    items = "".join(f"        {key!r}, cam.{attr},\n" for key, attr, _ in fields)
+    src = (
+        "def _apply_camera(self, cam):\n"
+        "    self.tk.call('array', 'set', self._cam_array, (\n"
+        f"{items}"
+        "    ))\n"
+    )
+    namespace = {}
+    exec(compile(src, '<camform>', 'exec'), namespace)
+    return namespace['_apply_camera']
+
+
+def _probe_camera(source: str):
+    """Mở camera và đọc 1 frame (chạy trên luồng probe), None nếu lỗi"""
+    import cv2
+    cap = cv2.VideoCapture(source)
+    try:
+        ret, frame = cap.read()
+    finally:
+        cap.release()
+    return frame if ret else None
+
+
+def _probe_plc(ip: str, rack: int, slot: int) -> Tuple[bool, List[str]]:
+    """Thử kết nối PLC (chạy trên luồng probe), trả về (thành công, lỗi)"""
+    from ..plc import PLCClient
+    
+    errors: List[str] = []
+    client = PLCClient(ip=ip, rack=rack, slot=slot, on_error=errors.append)
+    try:
+        return client.connect(), errors
+    finally:
+        client.disconnect()
+
+
+class _VirtualList(tk.Frame):
+    """
+    Danh sách ảo hóa (thay tk.Listbox cho danh sách camera dài)
+    
+    Chỉ vẽ các dòng đang nằm trong vùng nhìn thấy, các item canvas của
+    dòng được dùng lại khi cuộn (không tạo mới). API giống một phần
+    tk.Listbox: insert/delete/size/get/curselection/selection_set/see
+    và phát sự kiện <<ListboxSelect>>.
+    """
+    
+    def __init__(self, parent, bg='#2c3e50', fg='white',
+                 selectbackground='#3498db', font=('Arial', 10), width: int = 200):
+        super().__init__(parent, bg=bg)
+        
+        self._items: List[str] = []
+        self._selected: Optional[int] = None
+        self._fg = fg
+        self._select_bg = selectbackground
+        self._font = font
+        self._row_h = tkfont.Font(font=font).metrics('linespace') + 4
+        
+        # Pool các dòng đã vẽ: [(rect_id, text_id), ...]
+        self._rows: List[Tuple[int, int]] = []
+        
+        self._canvas = tk.Canvas(self, bg=bg, highlightthickness=0, width=width,
+                                 yscrollincrement=self._row_h, takefocus=1)
+        scrollbar = tk.Scrollbar(self, orient=tk.VERTICAL, command=self._yview)
+        self._canvas.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self._canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        self._canvas.bind('<Configure>', self._redraw)
+        self._canvas.bind('<MouseWheel>', self._on_wheel)
+        self._canvas.bind('<Button-4>', lambda e: self._scroll(-1))
+        self._canvas.bind('<Button-5>', lambda e: self._scroll(1))
+        self._canvas.bind('<Button-1>', self._on_click)
+        self._canvas.bind('<Up>', lambda e: self._move_selection(-1))
+        self._canvas.bind('<Down>', lambda e: self._move_selection(1))
+    
+    # ----- API kiểu Listbox -----
+    
+    def insert(self, index, *labels: str) -> None:
+        if index == tk.END:
+            self._items.extend(labels)
+        else:
+            self._items[index:index] = labels
+        self._update_scrollregion()
+    
+    def delete(self, first, last=None) -> None:
+        if first == tk.END:
+            first = len(self._items) - 1
+        if last is None:
+            last = first
+        elif last == tk.END:
+            last = len(self._items) - 1
+        del self._items[first:last + 1]
+        if self._selected is not None and self._selected >= len(self._items):
+            self._selected = None
+        self._update_scrollregion()
+    
+    def size(self) -> int:
+        return len(self._items)
+    
+    def get(self, index) -> str:
+        return self._items[index]
+    
+    def curselection(self) -> Tuple[int, ...]:
+        return () if self._selected is None else (self._selected,)
+    
+    def selection_set(self, index: int) -> None:
+        self._selected = index
+        self._redraw()
+    
+    def selection_clear(self, *args) -> None:
+        self._selected = None
+        self._redraw()
+    
+    def see(self, index: int) -> None:
+        first, visible = self._visible_range()
+        if index < first:
+            self._canvas.yview_moveto(index / max(len(self._items), 1))
+        elif index >= first + visible - 1:
+            self._canvas.yview_moveto((index - visible + 2) / max(len(self._items), 1))
+        self._redraw()
+    
+    # ----- Vẽ -----
+    
+    def _visible_range(self) -> Tuple[int, int]:
+        """(dòng đầu tiên đang thấy, số dòng vừa vùng nhìn)"""
+        first = int(self._canvas.canvasy(0) // self._row_h)
+        visible = self._canvas.winfo_height() // self._row_h + 2
+        return max(first, 0), visible
+    
+    def _update_scrollregion(self) -> None:
+        self._canvas.configure(scrollregion=(0, 0, 0, len(self._items) * self._row_h))
+        self._redraw()
+    
+    def _redraw(self, event=None) -> None:
+        canvas = self._canvas
+        row_h = self._row_h
+        width = canvas.winfo_width()
+        first, visible = self._visible_range()
+        
+        # Thêm item vào pool nếu vùng nhìn lớn hơn
+        while len(self._rows) < visible:
+            rect = canvas.create_rectangle(0, 0, 0, 0, width=0)
+            text = canvas.create_text(0, 0, anchor='w', fill=self._fg, font=self._font)
+            self._rows.append((rect, text))
+        
+        items = self._items
+        for slot, (rect, text) in enumerate(self._rows):
+            idx = first + slot
+            if slot >= visible or idx >= len(items):
+                canvas.itemconfigure(rect, state='hidden')
+                canvas.itemconfigure(text, state='hidden')
+                continue
+            y = idx * row_h
+            canvas.coords(rect, 0, y, width, y + row_h)
+            canvas.itemconfigure(rect, state='normal',
+                                 fill=self._select_bg if idx == self._selected else '')
+            canvas.coords(text, 4, y + row_h / 2)
+            canvas.itemconfigure(text, state='normal', text=items[idx])
+    
+    # ----- Sự kiện -----
+    
+    def _yview(self, *args) -> None:
+        self._canvas.yview(*args)
+        self._redraw()
+    
+    def _scroll(self, units: int) -> None:
+        self._canvas.yview_scroll(units, 'units')
+        self._redraw()
+    
+    def _on_wheel(self, event) -> None:
+        self._scroll(-1 if event.delta > 0 else 1)
+    
+    def _on_click(self, event) -> None:
+        self._canvas.focus_set()
+        idx = int(self._canvas.canvasy(event.y) // self._row_h)
+        if 0 <= idx < len(self._items):
+            self._select(idx)
+    
+    def _move_selection(self, step: int) -> None:
+        if not self._items:
+            return
+        idx = 0 if self._selected is None else self._selected + step
+        self._select(min(max(idx, 0), len(self._items) - 1))
+        self.see(self._selected)
+    
+    def _select(self, idx: int) -> None:
+        self._selected = idx
+        self._redraw()
+        self.event_generate('<<ListboxSelect>>')
 
 
 class ConfigPanel(tk.Toplevel):
@@ -25,6 +307,17 @@ class ConfigPanel(tk.Toplevel):
     Thiết kế cho người dùng không biết code
     """
     
+    # Thư mục chứa file model (tương đối với thư mục làm việc)
+    MODELS_DIR = "models"
+    MODEL_EXTS = ('.pt', '.engine', '.onnx')
+    
+    # Icon đã nạp, dùng chung cho mọi panel: {tên: PhotoImage hoặc None nếu không có file}
+    ICON_CACHE: Dict[str, Optional[tk.PhotoImage]] = {}
+    ICON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets')
+    
+    # Đổ CameraConfig vào form (sinh từ _CAM_FIELDS)
+    _apply_camera = _build_apply_camera(_CAM_FIELDS)
+    
     def __init__(self, parent, config, on_save: Optional[Callable] = None):
         super().__init__(parent)
         
@@ -32,6 +325,41 @@ class ConfigPanel(tk.Toplevel):
         self.on_save = on_save
         self.modified = False
         
+        # Cache JSON của config: chỉ serialize lại khi config đã bị sửa
+        self._config_json_cache: Optional[bytes] = None
+        self._config_dirty = True
+        # Lần import cuối: (path, mtime, dữ liệu đã parse)
+        self._import_cache: Optional[Tuple[str, float, dict]] = None
+        
+        # Nội dung đang hiển thị, để reload chỉ cập nhật phần thay đổi
+        self._camera_rows: List[str] = []
+        self._model_rows: Dict[str, Tuple[str, str, str]] = {}
+        # (hash config, số tab chưa dựng) của lần _load_current_config trước
+        self._last_loaded_key: Optional[Tuple[bytes, int]] = None
+        
+        # Frame xem trước cho ROI editor: {camera_id: (video_source, frame)}, LRU
+        self._roi_frames: 'OrderedDict[str, tuple]' = OrderedDict()
+        
+        # after-id của các callback đang chờ debounce/throttle: {khóa: after_id}
+        self._debounce_ids: Dict[object, str] = {}
+        
+        # Test camera/PLC chạy nền để không chặn luồng Tk khi chờ mạng
+        self._probe_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="CfgProbe")
+        # Probe đang chạy: {loại: after_id của lần poll kế tiếp}
+        self._probe_polls: Dict[str, str] = {}
+        # Nút Test của từng loại probe - bị disable trong lúc probe chạy
+        self._probe_buttons: Dict[str, tk.Button] = {}
+        
+        # Model gần đây cho hộp chọn nhanh, được quét nền từ MODELS_DIR
+        self._recent_models: deque = deque(maxlen=50)
+        threading.Thread(target=self._scan_models, daemon=True, name="CfgModelScan").start()
+        
+        # Báo "chưa lưu" tối đa 1 lần / 300ms dù nhiều biến cùng thay đổi
+        self._mark_dirty = self._throttle(self._on_dirty, 300)
+        self._loading_form = False
+        # Camera đang được sửa ở tab Phát hiện / Nâng cao (index trong config.cameras)
+        self._det_camera_idx = 0
+        
         self.title("Cấu hình hệ thống")
         self.geometry("900x700")
         self.configure(bg='#2c3e50')
@@ -41,149 +369,269 @@ class ConfigPanel(tk.Toplevel):
         self.grab_set()
         
         self._create_widgets()
-        self._load_current_config()
+        if self.config.cameras:
+            self._apply_detection(self.config.cameras[0])
+        self._ensure_tab_built()
     
     def _create_widgets(self):
         """Tạo các widget"""
+        self._create_styles()
+        self._create_variables()
+        
         # Notebook for tabs
         self.notebook = ttk.Notebook(self)
         self.notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
+        # Nội dung mỗi tab chỉ được dựng khi tab được chọn lần đầu
+        # {tên widget của tab: hàm dựng}, tab đã dựng sẽ bị xóa khỏi dict
+        self._tab_builders: Dict[str, Callable[[tk.Frame], None]] = {}
+        
         # Tab 1: Cameras
-        self.cameras_frame = self._create_cameras_tab()
-        self.notebook.add(self.cameras_frame, text="📹 Cameras")
+        self.cameras_frame = self._add_lazy_tab(self._icon_label('cameras', "📹", "Cameras"), self._create_cameras_tab)
         
         # Tab 2: Models  
-        self.models_frame = self._create_models_tab()
-        self.notebook.add(self.models_frame, text="🤖 Models")
+        self.models_frame = self._add_lazy_tab(self._icon_label('models', "🤖", "Models"), self._create_models_tab)
         
         # Tab 3: Detection Settings
-        self.detection_frame = self._create_detection_tab()
-        self.notebook.add(self.detection_frame, text="🔍 Phát hiện")
+        self.detection_frame = self._add_lazy_tab(self._icon_label('detection', "🔍", "Phát hiện"), self._create_detection_tab)
         
         # Tab 4: Advanced
-        self.advanced_frame = self._create_advanced_tab()
-        self.notebook.add(self.advanced_frame, text="⚙️ Nâng cao")
+        self.advanced_frame = self._add_lazy_tab(self._icon_label('advanced', "⚙️", "Nâng cao"), self._create_advanced_tab)
+        
+        self.notebook.bind('<<NotebookTabChanged>>', self._ensure_tab_built)
         
         # Bottom buttons
         self._create_bottom_buttons()
     
-    def _create_cameras_tab(self) -> tk.Frame:
-        """Tab cấu hình cameras"""
+    def _create_styles(self):
+        """Khai báo style ttk 1 lần, các label chỉ cần tham chiếu tên style"""
+        style = ttk.Style(self)
+        style.configure('Cfg.TLabel', background='#34495e', foreground='white',
+                        font=('Arial', 10))
+        style.configure('CfgTitle.TLabel', background='#34495e', foreground='white',
+                        font=('Arial', 14, 'bold'))
+        style.configure('CfgHeader.TLabel', background='#34495e', foreground='white',
+                        font=('Arial', 12, 'bold'))
+        style.configure('CfgStatus.TLabel', background='#2c3e50', foreground='#f39c12',
+                        font=('Arial', 10, 'bold'))
+        style.configure('CfgHelp.TLabel', background='#34495e', foreground='#bdc3c7',
+                        font=('Arial', 9))
+    
+    def _icon(self, name: str) -> Optional[tk.PhotoImage]:
+        """PhotoImage của ui/assets/<name>.png, chỉ decode 1 lần"""
+        cache = ConfigPanel.ICON_CACHE
+        if name not in cache:
+            path = os.path.join(self.ICON_DIR, f"{name}.png")
+            cache[name] = tk.PhotoImage(master=self, file=path) if os.path.exists(path) else None
+        return cache[name]
+    
+    def _icon_label(self, name: str, emoji: str, text: str) -> dict:
+        """Tham số text/image cho nút hoặc tab
+        
+        Có icon -> ảnh + chữ, không có -> giữ emoji như cũ.
+        """
+        icon = self._icon(name)
+        if icon is None:
+            return {'text': f"{emoji} {text}"}
+        return {'text': text, 'image': icon, 'compound': 'left'}
+    
+    def _create_variables(self):
+        """Tạo các biến Tk (dùng được cả khi tab chứa chúng chưa dựng)"""
+        # Camera: các biến là phần tử của 1 mảng Tcl để _on_camera_select
+        # cập nhật tất cả bằng 1 lệnh "array set"
+        self._cam_array = f"::_camvars{id(self)}"
+        self._cam_vars: Dict[str, tk.StringVar] = {
+            key: tk.StringVar(self, value=value, name=f"{self._cam_array}({key})")
+            for key, _, value in _CAM_FIELDS
+        }
+        self.cam_name_var = self._cam_vars['name']
+        self.cam_rtsp_var = self._cam_vars['rtsp']
+        self.plc_ip_var = self._cam_vars['plc_ip']
+        self.plc_db_var = self._cam_vars['plc_db']
+        self.person_byte_var = self._cam_vars['person_byte']
+        self.person_bit_var = self._cam_vars['person_bit']
+        self.coal_byte_var = self._cam_vars['coal_byte']
+        self.coal_bit_var = self._cam_vars['coal_bit']
+        # Đổi địa chỉ RTSP -> frame ROI đã cache của camera đó hết hiệu lực
+        self.cam_rtsp_var.trace_add('write', self._on_rtsp_changed)
+        
+        # Phát hiện
+        self._det_vars: Dict[str, tk.IntVar] = {
+            key: tk.IntVar(self, value=default)
+            for _, key, _, _, _, _, default in _DET_SCALES
+        }
+        self.confidence_var = self._det_vars['confidence']
+        self.person_consecutive_var = self._det_vars['person_on']
+        self.person_off_var = self._det_vars['person_off']
+        self.coal_ratio_var = self._det_vars['coal_ratio']
+        self.coal_consecutive_var = self._det_vars['coal_on']
+        self.coal_enabled_var = tk.BooleanVar(value=True)
+        self._det_target_var = tk.StringVar(self, value="")
+        
+        # Nâng cao
+        self.fps_var = tk.IntVar(value=22)
+        self.artifacts_var = tk.StringVar(value="artifacts")
+        self.logs_var = tk.StringVar(value="logs")
+        
+        # Người dùng sửa bất kỳ ô nào -> hiện "● Chưa lưu"
+        for var in (*self._cam_vars.values(),
+                    self.confidence_var, self.person_consecutive_var, self.person_off_var,
+                    self.coal_ratio_var, self.coal_consecutive_var, self.coal_enabled_var,
+                    self.fps_var, self.artifacts_var, self.logs_var):
+            var.trace_add('write', self._on_var_write)
+    
+    def _add_lazy_tab(self, label: dict, builder: Callable[[tk.Frame], None]) -> tk.Frame:
+        """Thêm tab rỗng, nội dung dựng sau bằng builder"""
         frame = tk.Frame(self.notebook, bg='#34495e')
+        self.notebook.add(frame, **label)
+        self._tab_builders[str(frame)] = builder
+        return frame
+    
+    def _tab_built(self, frame: tk.Frame) -> bool:
+        return str(frame) not in self._tab_builders
+    
+    def _ensure_tab_built(self, event=None):
+        """Dựng nội dung tab đang chọn nếu chưa dựng"""
+        tab = str(self.notebook.select())
+        builder = self._tab_builders.pop(tab, None)
+        if builder is None:
+            return
+        builder(self.nametowidget(tab))
+        self._load_current_config()
+    
+    def _create_cameras_tab(self, frame: tk.Frame) -> None:
+        """Tab cấu hình cameras"""
+        # Cột trái rộng cố định 250px, cột phải co giãn theo cửa sổ
+        frame.grid_columnconfigure(0, weight=0, minsize=250)
+        frame.grid_columnconfigure(1, weight=1)
+        frame.grid_rowconfigure(0, weight=1)
         
         # Left: Camera list
-        left_frame = tk.Frame(frame, bg='#34495e', width=250)
-        left_frame.pack(side=tk.LEFT, fill=tk.Y, padx=5, pady=5)
-        left_frame.pack_propagate(False)
+        left_frame = tk.Frame(frame, bg='#34495e')
+        left_frame.grid(row=0, column=0, sticky='nsew', padx=5, pady=5)
+        left_frame.grid_columnconfigure(0, weight=1)
+        left_frame.grid_rowconfigure(1, weight=1)
         
-        tk.Label(left_frame, text="Danh sách Camera", 
-                bg='#34495e', fg='white', font=('Arial', 12, 'bold')
-        ).pack(pady=5)
+        ttk.Label(left_frame, text="Danh sách Camera", style='CfgHeader.TLabel'
+                  ).grid(row=0, column=0, pady=5)
         
-        # Listbox
-        self.camera_listbox = tk.Listbox(left_frame, bg='#2c3e50', fg='white',
-                                         selectbackground='#3498db', font=('Arial', 10))
-        self.camera_listbox.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-        self.camera_listbox.bind('<<ListboxSelect>>', self._on_camera_select)
+        # Listbox (ảo hóa: chỉ vẽ các dòng đang thấy)
+        self.camera_listbox = _VirtualList(left_frame, bg='#2c3e50', fg='white',
+                                           selectbackground='#3498db', font=('Arial', 10),
+                                           width=210)
+        self.camera_listbox.grid(row=1, column=0, sticky='nsew', padx=5, pady=5)
+        self.camera_listbox.bind('<<ListboxSelect>>', self._debounce(self._on_camera_select, 80))
         
         # Buttons
         btn_frame = tk.Frame(left_frame, bg='#34495e')
-        btn_frame.pack(fill=tk.X, padx=5, pady=5)
+        btn_frame.grid(row=2, column=0, sticky='ew', padx=5, pady=5)
         
-        tk.Button(btn_frame, text="➕ Thêm", command=self._add_camera,
+        tk.Button(btn_frame, **self._icon_label('add', "➕", "Thêm"), command=self._add_camera,
                  bg='#27ae60', fg='white').pack(side=tk.LEFT, padx=2)
-        tk.Button(btn_frame, text="➖ Xóa", command=self._remove_camera,
+        tk.Button(btn_frame, **self._icon_label('remove', "➖", "Xóa"), command=self._remove_camera,
                  bg='#e74c3c', fg='white').pack(side=tk.LEFT, padx=2)
         
         # Right: Camera details
         right_frame = tk.Frame(frame, bg='#34495e')
-        right_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=5, pady=5)
+        right_frame.grid(row=0, column=1, sticky='nsew', padx=5, pady=5)
+        right_frame.grid_columnconfigure(0, weight=1)
+        right_frame.grid_anchor('n')
         
         self._create_camera_detail_form(right_frame)
-        
-        return frame
     
     def _create_camera_detail_form(self, parent):
         """Form chi tiết camera"""
         # Camera Info
         info_frame = tk.LabelFrame(parent, text="Thông tin Camera",
                                    bg='#34495e', fg='white', font=('Arial', 10, 'bold'))
-        info_frame.pack(fill=tk.X, padx=5, pady=5)
+        info_frame.grid(row=0, column=0, sticky='ew', padx=5, pady=5)
         
-        # Name
-        row = tk.Frame(info_frame, bg='#34495e')
-        row.pack(fill=tk.X, padx=10, pady=3)
-        tk.Label(row, text="Tên camera:", bg='#34495e', fg='white', width=15, anchor='w').pack(side=tk.LEFT)
-        self.cam_name_var = tk.StringVar()
-        tk.Entry(row, textvariable=self.cam_name_var, width=40).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        info_frame.grid_columnconfigure(1, weight=1)
         
-        # RTSP URL
-        row = tk.Frame(info_frame, bg='#34495e')
-        row.pack(fill=tk.X, padx=10, pady=3)
-        tk.Label(row, text="Địa chỉ RTSP:", bg='#34495e', fg='white', width=15, anchor='w').pack(side=tk.LEFT)
-        self.cam_rtsp_var = tk.StringVar()
-        tk.Entry(row, textvariable=self.cam_rtsp_var, width=40).pack(side=tk.LEFT, fill=tk.X, expand=True)
-        tk.Button(row, text="Test", command=self._test_camera, bg='#3498db', fg='white').pack(side=tk.RIGHT, padx=5)
+        # (nhãn, biến, độ rộng ô nhập, nút (text, lệnh, màu) hoặc None)
+        info_fields = (
+            ("Tên camera:", self.cam_name_var, 40, None),
+            ("Địa chỉ RTSP:", self.cam_rtsp_var, 40,
+             ("Test", self._test_camera, '#3498db')),
+        )
+        for r, (label, var, width, button) in enumerate(info_fields):
+            _, btn = self._add_field(info_frame, r, label, var, width, button)
+            if btn is not None:
+                self._probe_buttons['camera'] = btn
         
         # PLC Info
         plc_frame = tk.LabelFrame(parent, text="Cấu hình PLC",
                                   bg='#34495e', fg='white', font=('Arial', 10, 'bold'))
-        plc_frame.pack(fill=tk.X, padx=5, pady=5)
+        plc_frame.grid(row=1, column=0, sticky='ew', padx=5, pady=5)
+        plc_frame.grid_columnconfigure(1, weight=1)
         
-        # PLC IP
-        row = tk.Frame(plc_frame, bg='#34495e')
-        row.pack(fill=tk.X, padx=10, pady=3)
-        tk.Label(row, text="IP PLC:", bg='#34495e', fg='white', width=15, anchor='w').pack(side=tk.LEFT)
-        self.plc_ip_var = tk.StringVar()
-        tk.Entry(row, textvariable=self.plc_ip_var, width=20).pack(side=tk.LEFT)
-        tk.Button(row, text="Test PLC", command=self._test_plc, bg='#e67e22', fg='white').pack(side=tk.RIGHT, padx=5)
-        
-        # PLC Address
-        row = tk.Frame(plc_frame, bg='#34495e')
-        row.pack(fill=tk.X, padx=10, pady=3)
-        tk.Label(row, text="DB Number:", bg='#34495e', fg='white', width=15, anchor='w').pack(side=tk.LEFT)
-        self.plc_db_var = tk.StringVar(value="300")
-        tk.Entry(row, textvariable=self.plc_db_var, width=10).pack(side=tk.LEFT)
+        plc_fields = (
+            ("IP PLC:", self.plc_ip_var, 20,
+             ("Test PLC", self._test_plc, '#e67e22')),
+            ("DB Number:", self.plc_db_var, 10, None),
+        )
+        for r, (label, var, width, button) in enumerate(plc_fields):
+            _, btn = self._add_field(plc_frame, r, label, var, width, button)
+            if btn is not None:
+                self._probe_buttons['plc'] = btn
         
-        # Alarm addresses
-        row = tk.Frame(plc_frame, bg='#34495e')
-        row.pack(fill=tk.X, padx=10, pady=3)
-        tk.Label(row, text="Địa chỉ báo động người:", bg='#34495e', fg='white', width=20, anchor='w').pack(side=tk.LEFT)
-        self.person_byte_var = tk.StringVar(value="6")
-        self.person_bit_var = tk.StringVar(value="0")
-        tk.Entry(row, textvariable=self.person_byte_var, width=5).pack(side=tk.LEFT)
-        tk.Label(row, text=".", bg='#34495e', fg='white').pack(side=tk.LEFT)
-        tk.Entry(row, textvariable=self.person_bit_var, width=5).pack(side=tk.LEFT)
-        
-        row = tk.Frame(plc_frame, bg='#34495e')
-        row.pack(fill=tk.X, padx=10, pady=3)
-        tk.Label(row, text="Địa chỉ báo động than:", bg='#34495e', fg='white', width=20, anchor='w').pack(side=tk.LEFT)
-        self.coal_byte_var = tk.StringVar(value="6")
-        self.coal_bit_var = tk.StringVar(value="1")
-        tk.Entry(row, textvariable=self.coal_byte_var, width=5).pack(side=tk.LEFT)
-        tk.Label(row, text=".", bg='#34495e', fg='white').pack(side=tk.LEFT)
-        tk.Entry(row, textvariable=self.coal_bit_var, width=5).pack(side=tk.LEFT)
+        # Alarm addresses (byte.bit)
+        alarm_fields = (
+            ("Địa chỉ báo động người:", self.person_byte_var, self.person_bit_var),
+            ("Địa chỉ báo động than:", self.coal_byte_var, self.coal_bit_var),
+        )
+        for r, (label, byte_var, bit_var) in enumerate(alarm_fields, start=len(plc_fields)):
+            self._add_bit_field(plc_frame, r, label, byte_var, bit_var)
         
         # ROI Button
         roi_frame = tk.LabelFrame(parent, text="Vùng quan tâm (ROI)",
                                   bg='#34495e', fg='white', font=('Arial', 10, 'bold'))
-        roi_frame.pack(fill=tk.X, padx=5, pady=5)
+        roi_frame.grid(row=2, column=0, sticky='ew', padx=5, pady=5)
         
-        tk.Button(roi_frame, text="🎯 Vẽ vùng phát hiện người", 
+        tk.Button(roi_frame, **self._icon_label('roi_person', "🎯", "Vẽ vùng phát hiện người"), 
                  command=lambda: self._open_roi_editor('person'),
                  bg='#9b59b6', fg='white', font=('Arial', 10)).pack(fill=tk.X, padx=10, pady=5)
         
-        tk.Button(roi_frame, text="⬛ Vẽ vùng phát hiện than",
+        tk.Button(roi_frame, **self._icon_label('roi_coal', "⬛", "Vẽ vùng phát hiện than"),
                  command=lambda: self._open_roi_editor('coal'),
                  bg='#e74c3c', fg='white', font=('Arial', 10)).pack(fill=tk.X, padx=10, pady=5)
     
-    def _create_models_tab(self) -> tk.Frame:
-        """Tab cấu hình models"""
-        frame = tk.Frame(self.notebook, bg='#34495e')
+    def _add_field(self, parent, r: int, label: str, var: tk.Variable,
+                   width: int = 40, button: Optional[tuple] = None
+                   ) -> Tuple[ttk.Entry, Optional[tk.Button]]:
+        """Thêm 1 dòng nhãn + ô nhập (+ nút) vào grid của parent
+        
+        Cột: 0 nhãn | 1-3 ô nhập | 4 nút
         
-        tk.Label(frame, text="Cấu hình Models YOLO", 
-                bg='#34495e', fg='white', font=('Arial', 14, 'bold')).pack(pady=10)
+        Returns:
+            (ô nhập, nút hoặc None)
+        """
+        ttk.Label(parent, text=label, style='Cfg.TLabel').grid(
+            row=r, column=0, sticky='w', padx=10, pady=3)
+        entry = ttk.Entry(parent, textvariable=var, width=width)
+        entry.grid(row=r, column=1, columnspan=3,
+                   sticky='ew' if width >= 40 else 'w', padx=5, pady=3)
+        btn = None
+        if button is not None:
+            text, command, color = button
+            btn = tk.Button(parent, text=text, command=command, bg=color, fg='white')
+            btn.grid(row=r, column=4, padx=5, pady=3)
+        return entry, btn
+    
+    def _add_bit_field(self, parent, r: int, label: str,
+                       byte_var: tk.Variable, bit_var: tk.Variable) -> None:
+        """Thêm 1 dòng địa chỉ byte.bit vào grid của parent"""
+        ttk.Label(parent, text=label, style='Cfg.TLabel').grid(
+            row=r, column=0, sticky='w', padx=10, pady=3)
+        ttk.Entry(parent, textvariable=byte_var, width=5).grid(
+            row=r, column=1, sticky='w', padx=(5, 0), pady=3)
+        ttk.Label(parent, text=".", style='Cfg.TLabel').grid(row=r, column=2, pady=3)
+        ttk.Entry(parent, textvariable=bit_var, width=5).grid(
+            row=r, column=3, sticky='w', pady=3)
+    
+    def _create_models_tab(self, frame: tk.Frame) -> None:
+        """Tab cấu hình models"""
+        ttk.Label(frame, text="Cấu hình Models YOLO", style='CfgTitle.TLabel').pack(pady=10)
         
         # Models list
         self.models_tree = ttk.Treeview(frame, columns=('name', 'path', 'cameras'), 
@@ -195,18 +643,19 @@ class ConfigPanel(tk.Toplevel):
         self.models_tree.column('path', width=300)
         self.models_tree.column('cameras', width=150)
         self.models_tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        self.models_tree.tk.eval(_TREE_FILL_SCRIPT)
         
         # Buttons
         btn_frame = tk.Frame(frame, bg='#34495e')
         btn_frame.pack(fill=tk.X, padx=10, pady=5)
         
-        tk.Button(btn_frame, text="➕ Thêm Model", command=self._add_model,
+        tk.Button(btn_frame, **self._icon_label('add', "➕", "Thêm Model"), command=self._add_model,
                  bg='#27ae60', fg='white').pack(side=tk.LEFT, padx=5)
-        tk.Button(btn_frame, text="✏️ Sửa", command=self._edit_model,
+        tk.Button(btn_frame, **self._icon_label('edit', "✏️", "Sửa"), command=self._edit_model,
                  bg='#3498db', fg='white').pack(side=tk.LEFT, padx=5)
-        tk.Button(btn_frame, text="➖ Xóa", command=self._remove_model,
+        tk.Button(btn_frame, **self._icon_label('remove', "➖", "Xóa"), command=self._remove_model,
                  bg='#e74c3c', fg='white').pack(side=tk.LEFT, padx=5)
-        tk.Button(btn_frame, text="📁 Chọn file model...", command=self._browse_model,
+        tk.Button(btn_frame, **self._icon_label('folder', "📁", "Chọn file model..."), command=self._browse_model,
                  bg='#9b59b6', fg='white').pack(side=tk.RIGHT, padx=5)
         
         # Help text
@@ -216,77 +665,43 @@ class ConfigPanel(tk.Toplevel):
 - Camera số nào dùng model nào được cấu hình trong cột "Cameras"  
 - Ví dụ: cameras [1, 2, 3] nghĩa là Camera 1, 2, 3 dùng model này
         """
-        tk.Label(frame, text=help_text, bg='#34495e', fg='#bdc3c7', 
-                justify=tk.LEFT, font=('Arial', 9)).pack(pady=10)
-        
-        return frame
+        ttk.Label(frame, text=help_text, style='CfgHelp.TLabel',
+                  justify=tk.LEFT).pack(pady=10)
     
-    def _create_detection_tab(self) -> tk.Frame:
+    def _create_detection_tab(self, frame: tk.Frame) -> None:
         """Tab cấu hình detection"""
-        frame = tk.Frame(self.notebook, bg='#34495e')
-        
-        tk.Label(frame, text="Cấu hình phát hiện", 
-                bg='#34495e', fg='white', font=('Arial', 14, 'bold')).pack(pady=10)
+        ttk.Label(frame, text="Cấu hình phát hiện", style='CfgTitle.TLabel').pack(pady=10)
+        ttk.Label(frame, textvariable=self._det_target_var, style='Cfg.TLabel').pack()
         
         # Detection settings
         settings_frame = tk.Frame(frame, bg='#34495e')
         settings_frame.pack(fill=tk.X, padx=20, pady=10)
         
-        # Confidence threshold
-        row = tk.Frame(settings_frame, bg='#34495e')
-        row.pack(fill=tk.X, pady=5)
-        tk.Label(row, text="Ngưỡng tin cậy (%):", bg='#34495e', fg='white', width=25, anchor='w').pack(side=tk.LEFT)
-        self.confidence_var = tk.IntVar(value=70)
-        tk.Scale(row, from_=10, to=100, orient=tk.HORIZONTAL, variable=self.confidence_var,
-                bg='#34495e', fg='white', length=300).pack(side=tk.LEFT, fill=tk.X, expand=True)
-        
-        # Person consecutive frames
-        row = tk.Frame(settings_frame, bg='#34495e')
-        row.pack(fill=tk.X, pady=5)
-        tk.Label(row, text="Số frame liên tiếp BẬT cảnh báo người:", bg='#34495e', fg='white', width=35, anchor='w').pack(side=tk.LEFT)
-        self.person_consecutive_var = tk.IntVar(value=3)
-        tk.Scale(row, from_=1, to=20, orient=tk.HORIZONTAL, variable=self.person_consecutive_var,
-                bg='#34495e', fg='white', length=200).pack(side=tk.LEFT)
-        
-        # Person off frames
-        row = tk.Frame(settings_frame, bg='#34495e')
-        row.pack(fill=tk.X, pady=5)
-        tk.Label(row, text="Số frame để TẮT cảnh báo người:", bg='#34495e', fg='white', width=35, anchor='w').pack(side=tk.LEFT)
-        self.person_off_var = tk.IntVar(value=5)
-        tk.Scale(row, from_=1, to=20, orient=tk.HORIZONTAL, variable=self.person_off_var,
-                bg='#34495e', fg='white', length=200).pack(side=tk.LEFT)
-        
-        # Coal ratio threshold
-        row = tk.Frame(settings_frame, bg='#34495e')
-        row.pack(fill=tk.X, pady=5)
-        tk.Label(row, text="Ngưỡng tỷ lệ than (%):", bg='#34495e', fg='white', width=25, anchor='w').pack(side=tk.LEFT)
-        self.coal_ratio_var = tk.IntVar(value=73)
-        tk.Scale(row, from_=30, to=100, orient=tk.HORIZONTAL, variable=self.coal_ratio_var,
-                bg='#34495e', fg='white', length=300).pack(side=tk.LEFT, fill=tk.X, expand=True)
-        
-        # Coal consecutive frames
-        row = tk.Frame(settings_frame, bg='#34495e')
-        row.pack(fill=tk.X, pady=5)
-        tk.Label(row, text="Số frame liên tiếp BẬT cảnh báo than:", bg='#34495e', fg='white', width=35, anchor='w').pack(side=tk.LEFT)
-        self.coal_consecutive_var = tk.IntVar(value=5)
-        tk.Scale(row, from_=1, to=50, orient=tk.HORIZONTAL, variable=self.coal_consecutive_var,
-                bg='#34495e', fg='white', length=200).pack(side=tk.LEFT)
+        # 1 vòng lặp dựng mọi Scale từ bảng _DET_SCALES, cùng 1 callback debounce
+        on_change = self._debounce(self._on_detection_changed, 150)
+        for label, key, from_, to, length, label_width, _ in _DET_SCALES:
+            row = tk.Frame(settings_frame, bg='#34495e')
+            row.pack(fill=tk.X, pady=5)
+            ttk.Label(row, text=label, style='Cfg.TLabel', width=label_width, anchor='w').pack(side=tk.LEFT)
+            scale = tk.Scale(row, from_=from_, to=to, orient=tk.HORIZONTAL,
+                             variable=self._det_vars[key], command=on_change,
+                             bg='#34495e', fg='white', length=length)
+            if length >= 300:
+                scale.pack(side=tk.LEFT, fill=tk.X, expand=True)
+            else:
+                scale.pack(side=tk.LEFT)
         
         # Enable coal detection
-        self.coal_enabled_var = tk.BooleanVar(value=True)
         tk.Checkbutton(settings_frame, text="Bật phát hiện tắc than",
                       variable=self.coal_enabled_var,
+                      command=self._on_detection_changed,
                       bg='#34495e', fg='white', selectcolor='#2c3e50',
                       font=('Arial', 11, 'bold')).pack(pady=10)
-        
-        return frame
     
-    def _create_advanced_tab(self) -> tk.Frame:
+    def _create_advanced_tab(self, frame: tk.Frame) -> None:
         """Tab cài đặt nâng cao"""
-        frame = tk.Frame(self.notebook, bg='#34495e')
-        
-        tk.Label(frame, text="Cài đặt nâng cao", 
-                bg='#34495e', fg='white', font=('Arial', 14, 'bold')).pack(pady=10)
+        ttk.Label(frame, text="Cài đặt nâng cao", style='CfgTitle.TLabel').pack(pady=10)
+        ttk.Label(frame, textvariable=self._det_target_var, style='Cfg.TLabel').pack()
         
         settings_frame = tk.Frame(frame, bg='#34495e')
         settings_frame.pack(fill=tk.X, padx=20, pady=10)
@@ -294,9 +709,9 @@ class ConfigPanel(tk.Toplevel):
         # Target FPS
         row = tk.Frame(settings_frame, bg='#34495e')
         row.pack(fill=tk.X, pady=5)
-        tk.Label(row, text="FPS mục tiêu:", bg='#34495e', fg='white', width=20, anchor='w').pack(side=tk.LEFT)
-        self.fps_var = tk.IntVar(value=22)
+        ttk.Label(row, text="FPS mục tiêu:", style='Cfg.TLabel', width=20, anchor='w').pack(side=tk.LEFT)
         tk.Scale(row, from_=1, to=30, orient=tk.HORIZONTAL, variable=self.fps_var,
+                command=self._debounce(self._on_detection_changed, 150),
                 bg='#34495e', fg='white', length=200).pack(side=tk.LEFT)
         
         # Paths
@@ -306,15 +721,13 @@ class ConfigPanel(tk.Toplevel):
         
         row = tk.Frame(path_frame, bg='#34495e')
         row.pack(fill=tk.X, padx=10, pady=3)
-        tk.Label(row, text="Thư mục ảnh:", bg='#34495e', fg='white', width=15, anchor='w').pack(side=tk.LEFT)
-        self.artifacts_var = tk.StringVar(value="artifacts")
+        ttk.Label(row, text="Thư mục ảnh:", style='Cfg.TLabel', width=15, anchor='w').pack(side=tk.LEFT)
         tk.Entry(row, textvariable=self.artifacts_var, width=40).pack(side=tk.LEFT)
         tk.Button(row, text="...", command=lambda: self._browse_folder(self.artifacts_var)).pack(side=tk.LEFT, padx=5)
         
         row = tk.Frame(path_frame, bg='#34495e')
         row.pack(fill=tk.X, padx=10, pady=3)
-        tk.Label(row, text="Thư mục log:", bg='#34495e', fg='white', width=15, anchor='w').pack(side=tk.LEFT)
-        self.logs_var = tk.StringVar(value="logs")
+        ttk.Label(row, text="Thư mục log:", style='Cfg.TLabel', width=15, anchor='w').pack(side=tk.LEFT)
         tk.Entry(row, textvariable=self.logs_var, width=40).pack(side=tk.LEFT)
         tk.Button(row, text="...", command=lambda: self._browse_folder(self.logs_var)).pack(side=tk.LEFT, padx=5)
         
@@ -322,49 +735,208 @@ class ConfigPanel(tk.Toplevel):
         backup_frame = tk.Frame(frame, bg='#34495e')
         backup_frame.pack(fill=tk.X, padx=20, pady=20)
         
-        tk.Button(backup_frame, text="📥 Xuất cấu hình (Backup)", 
+        tk.Button(backup_frame, **self._icon_label('export', "📥", "Xuất cấu hình (Backup)"), 
                  command=self._export_config, bg='#3498db', fg='white',
                  font=('Arial', 10)).pack(side=tk.LEFT, padx=10)
-        tk.Button(backup_frame, text="📤 Nhập cấu hình (Restore)",
+        tk.Button(backup_frame, **self._icon_label('import', "📤", "Nhập cấu hình (Restore)"),
                  command=self._import_config, bg='#e67e22', fg='white',
                  font=('Arial', 10)).pack(side=tk.LEFT, padx=10)
-        
-        return frame
     
     def _create_bottom_buttons(self):
         """Tạo buttons ở dưới"""
         btn_frame = tk.Frame(self, bg='#2c3e50')
         btn_frame.pack(fill=tk.X, padx=10, pady=10)
         
-        tk.Button(btn_frame, text="💾 Lưu cấu hình", command=self._save_config,
+        tk.Button(btn_frame, **self._icon_label('save', "💾", "Lưu cấu hình"), command=self._save_config,
                  bg='#27ae60', fg='white', font=('Arial', 11, 'bold'),
                  width=15).pack(side=tk.RIGHT, padx=5)
         
-        tk.Button(btn_frame, text="❌ Hủy", command=self._cancel,
+        tk.Button(btn_frame, **self._icon_label('cancel', "❌", "Hủy"), command=self._cancel,
                  bg='#95a5a6', fg='white', font=('Arial', 11),
                  width=10).pack(side=tk.RIGHT, padx=5)
         
-        tk.Button(btn_frame, text="🔄 Reset về mặc định", command=self._reset_defaults,
+        tk.Button(btn_frame, **self._icon_label('reset', "🔄", "Reset về mặc định"), command=self._reset_defaults,
                  bg='#e74c3c', fg='white', font=('Arial', 10),
                  width=18).pack(side=tk.LEFT, padx=5)
+        
+        self.dirty_label = ttk.Label(btn_frame, text="", style='CfgStatus.TLabel')
+        self.dirty_label.pack(side=tk.LEFT, padx=10)
     
     def _load_current_config(self):
         """Load cấu hình hiện tại vào form"""
-        # Load cameras
-        self.camera_listbox.delete(0, tk.END)
-        for cam in self.config.cameras:
-            self.camera_listbox.insert(tk.END, f"{cam.name} ({cam.camera_id})")
-        
-        # Load models
-        for item in self.models_tree.get_children():
-            self.models_tree.delete(item)
-        
-        for model_id, model_cfg in self.config.models.items():
-            self.models_tree.insert('', tk.END, values=(
-                model_cfg.name,
-                model_cfg.path,
-                str(model_cfg.cameras)
-            ))
+        # Config và các tab đã dựng không đổi kể từ lần nạp trước -> bỏ qua
+        digest = hashlib.blake2b(_json_dumps(self.config.to_dict()), digest_size=16).digest()
+        key = (digest, len(self._tab_builders))
+        if key == self._last_loaded_key:
+            return
+        self._last_loaded_key = key
+        
+        loaders = []
+        if self._tab_built(self.cameras_frame):
+            loaders.append((self.camera_listbox, self._load_cameras))
+        if self._tab_built(self.models_frame):
+            loaders.append((self.models_tree, self._load_models))
+        if not loaders:
+            return
+        
+        # Tháo các widget ra khỏi layout trong lúc sửa nội dung để Tk chỉ
+        # tính lại layout 1 lần khi gắn lại
+        with self._suspend_layout(*(widget for widget, _ in loaders)):
+            for _, load in loaders:
+                load()
+    
+    @contextmanager
+    def _suspend_layout(self, *widgets: tk.Widget):
+        """Tháo các widget khỏi layout rồi gắn lại đúng vị trí cũ khi xong"""
+        restore = []
+        for widget in widgets:
+            if widget.winfo_manager() == 'grid':
+                # grid_remove giữ lại các tùy chọn grid, grid() khôi phục
+                widget.grid_remove()
+                restore.append((widget, None))
+                continue
+            siblings = widget.master.pack_slaves()
+            info = widget.pack_info()
+            idx = siblings.index(widget)
+            if idx + 1 < len(siblings):
+                info['before'] = siblings[idx + 1]
+            widget.pack_forget()
+            restore.append((widget, info))
+        try:
+            yield
+        finally:
+            for widget, info in reversed(restore):
+                if info is None:
+                    widget.grid()
+                else:
+                    widget.pack_configure(info)
+            self.update_idletasks()
+    
+    def _load_cameras(self):
+        """Nạp danh sách camera (bỏ qua nếu danh sách không đổi)"""
+        config = self.config
+        labels = [f"{name} ({cam_id})"
+                  for name, cam_id in zip(config.camera_names, config.camera_ids)]
+        if labels != self._camera_rows:
+            selection = self.camera_listbox.curselection()
+            self.camera_listbox.delete(0, tk.END)
+            self.camera_listbox.insert(tk.END, *labels)
+            if selection and selection[0] < len(labels):
+                self.camera_listbox.selection_set(selection[0])
+            self._camera_rows = labels
+    
+    def _load_models(self):
+        """Nạp danh sách model"""
+        # Diff theo model_id (iid của Treeview), chỉ xóa/thêm/sửa
+        # các dòng thay đổi thay vì dựng lại toàn bộ
+        tree = self.models_tree
+        rows = {
+            model_id: (model_cfg.name, model_cfg.path, str(model_cfg.cameras))
+            for model_id, model_cfg in self.config.models.items()
+        }
+        old_rows = self._model_rows
+        
+        removed = [iid for iid in old_rows if iid not in rows]
+        if removed:
+            tree.delete(*removed)
+        
+        added = [model_id for model_id in rows if model_id not in old_rows]
+        for model_id, values in rows.items():
+            if model_id in old_rows and old_rows[model_id] != values:
+                tree.item(model_id, values=values)
+        
+        if added:
+            # Ẩn Treeview trong lúc insert để Tk không vẽ lại sau từng dòng,
+            # toàn bộ dòng mới được đẩy sang Tcl trong 1 lệnh
+            tree.configure(show='')
+            try:
+                tree.tk.call(_TREE_FILL_PROC, tree._w,
+                             tuple((model_id, rows[model_id]) for model_id in added))
+            finally:
+                tree.configure(show='headings')
+        
+        self._model_rows = rows
+    
+    @staticmethod
+    def _timer_key(fn: Callable, key) -> object:
+        """Khóa hẹn giờ của fn: key nếu có, không thì hàm gốc của bound method
+        
+        Mỗi lần truy cập self.method tạo 1 bound method mới (id bị tái sử dụng
+        khi object cũ bị thu hồi) nên khóa theo __func__ - object sống suốt
+        vòng đời class, không trùng với callback khác.
+        """
+        return key if key is not None else getattr(fn, '__func__', fn)
+    
+    def _debounce(self, fn: Callable, ms: int = 150, key=None) -> Callable:
+        """Bọc fn để chuỗi sự kiện liên tục chỉ gọi fn 1 lần sau ms (ms)
+        
+        Các wrapper của cùng 1 fn (hoặc cùng key) dùng chung bộ đếm, vd. nhiều
+        Scale cùng gọi _on_detection_changed thì chỉ lần cuối được thực thi.
+        """
+        key = self._timer_key(fn, key)
+        
+        def fire(args):
+            self._debounce_ids.pop(key, None)
+            fn(*args)
+        
+        def wrapper(*args):
+            after_id = self._debounce_ids.pop(key, None)
+            if after_id is not None:
+                self.after_cancel(after_id)
+            self._debounce_ids[key] = self.after(ms, fire, args)
+        
+        return wrapper
+    
+    def _throttle(self, fn: Callable, ms: int = 300, key=None) -> Callable:
+        """Bọc fn để gọi tối đa 1 lần mỗi ms (ms), lần gọi nằm ở cuối khoảng
+        
+        Khác _debounce: chuỗi sự kiện kéo dài vẫn được xử lý đều đặn
+        thay vì chờ đến khi dừng hẳn.
+        """
+        key = self._timer_key(fn, key)
+        
+        def fire():
+            self._debounce_ids.pop(key, None)
+            fn()
+        
+        def wrapper(*args):
+            if key not in self._debounce_ids:
+                self._debounce_ids[key] = self.after(ms, fire)
+        
+        return wrapper
+    
+    def destroy(self):
+        # Hủy các callback debounce còn chờ trước khi widget bị xóa
+        for after_id in self._debounce_ids.values():
+            try:
+                self.after_cancel(after_id)
+            except:
+                pass
+        self._debounce_ids.clear()
+        for after_id in self._probe_polls.values():
+            try:
+                self.after_cancel(after_id)
+            except:
+                pass
+        self._probe_polls.clear()
+        self._probe_executor.shutdown(wait=False, cancel_futures=True)
+        super().destroy()
+    
+    def _mark_modified(self):
+        """Đánh dấu config đã bị sửa (cần lưu, cache JSON hết hạn)"""
+        self.modified = True
+        self._config_dirty = True
+        self._mark_dirty()
+    
+    def _on_var_write(self, *args):
+        # Bỏ qua khi chính form đang nạp dữ liệu camera
+        if not self._loading_form:
+            self.modified = True
+            self._mark_dirty()
+    
+    def _on_dirty(self):
+        """Cập nhật nhãn trạng thái lưu"""
+        self.dirty_label.configure(text="● Chưa lưu" if self.modified else "")
     
     # Event handlers
     def _on_camera_select(self, event):
@@ -375,16 +947,60 @@ class ConfigPanel(tk.Toplevel):
         
         idx = selection[0]
         if idx < len(self.config.cameras):
-            cam = self.config.cameras[idx]
-            
-            self.cam_name_var.set(cam.name)
-            self.cam_rtsp_var.set(cam.rtsp_url)
-            self.plc_ip_var.set(cam.plc.ip)
-            self.plc_db_var.set(str(cam.plc.db_number))
-            self.person_byte_var.set(str(cam.plc.person_alarm_byte))
-            self.person_bit_var.set(str(cam.plc.person_alarm_bit))
-            self.coal_byte_var.set(str(cam.plc.coal_alarm_byte))
-            self.coal_bit_var.set(str(cam.plc.coal_alarm_bit))
+            # 1 lệnh Tcl thay cho 8 lần StringVar.set
+            self._loading_form = True
+            try:
+                self._apply_camera(self.config.cameras[idx])
+            finally:
+                self._loading_form = False
+            self._det_camera_idx = idx
+            self._apply_detection(self.config.cameras[idx])
+    
+    def _apply_detection(self, cam):
+        """Nạp cấu hình phát hiện + FPS của cam vào các biến tab Phát hiện / Nâng cao"""
+        det = cam.detection
+        self._loading_form = True
+        try:
+            for key, attr, to_var, _ in _DET_FIELDS:
+                self._det_vars[key].set(to_var(getattr(det, attr)))
+            self.coal_enabled_var.set(det.coal_detection_enabled)
+            self.fps_var.set(cam.target_fps)
+            self._det_target_var.set(f"Áp dụng cho: {cam.name}")
+        finally:
+            self._loading_form = False
+    
+    def _on_detection_changed(self, *args):
+        """Ghi giá trị đã đổi ở tab Phát hiện / Nâng cao vào camera đang sửa
+        
+        So sánh từng biến với config của camera, chỉ ghi trường khác nhau -
+        giá trị vừa nạp từ config (hoặc sự kiện Scale không đổi gì) không ghi đè.
+        """
+        if self._loading_form:
+            return
+        cameras = self.config.cameras
+        if not 0 <= self._det_camera_idx < len(cameras):
+            return
+        cam = cameras[self._det_camera_idx]
+        det = cam.detection
+        
+        changed = False
+        for key, attr, to_var, to_config in _DET_FIELDS:
+            value = self._det_vars[key].get()
+            if to_var(getattr(det, attr)) != value:
+                setattr(det, attr, to_config(value))
+                changed = True
+        
+        coal_enabled = self.coal_enabled_var.get()
+        if det.coal_detection_enabled != coal_enabled:
+            det.coal_detection_enabled = coal_enabled
+            changed = True
+        fps = self.fps_var.get()
+        if cam.target_fps != fps:
+            cam.target_fps = fps
+            changed = True
+        
+        if changed:
+            self._mark_modified()
     
     def _add_camera(self):
         """Thêm camera mới"""
@@ -394,14 +1010,14 @@ class ConfigPanel(tk.Toplevel):
             cam_id = f"camera_{len(self.config.cameras) + 1}"
             messagebox.showinfo("Thông báo", f"Đã thêm camera: {name}\nVui lòng cấu hình thông tin chi tiết.")
             self._load_current_config()
-            self.modified = True
+            self._mark_modified()
     
     def _remove_camera(self):
         """Xóa camera"""
         selection = self.camera_listbox.curselection()
         if selection:
             if messagebox.askyesno("Xác nhận", "Bạn có chắc muốn xóa camera này?"):
-                self.modified = True
+                self._mark_modified()
     
     def _test_camera(self):
         """Test kết nối camera"""
@@ -410,8 +1026,20 @@ class ConfigPanel(tk.Toplevel):
             messagebox.showwarning("Cảnh báo", "Vui lòng nhập địa chỉ RTSP!")
             return
         
-        messagebox.showinfo("Test Camera", f"Đang test kết nối...\n{rtsp}")
-        # TODO: Implement actual test
+        cam = self._current_camera()
+        camera_id = cam.camera_id if cam is not None else None
+        
+        def on_done(frame):
+            if frame is None:
+                messagebox.showerror("Test Camera", f"Không thể kết nối camera:\n{rtsp}", parent=self)
+                return
+            # Dùng luôn frame vừa đọc cho ROI editor
+            if camera_id is not None:
+                self._cache_roi_frame(camera_id, rtsp, frame)
+            h, w = frame.shape[:2]
+            messagebox.showinfo("Test Camera", f"Kết nối thành công ({w}x{h})\n{rtsp}", parent=self)
+        
+        self._run_probe('camera', _probe_camera, (rtsp,), on_done)
     
     def _test_plc(self):
         """Test kết nối PLC"""
@@ -420,29 +1048,205 @@ class ConfigPanel(tk.Toplevel):
             messagebox.showwarning("Cảnh báo", "Vui lòng nhập IP PLC!")
             return
         
-        messagebox.showinfo("Test PLC", f"Đang test kết nối PLC...\n{ip}")
-        # TODO: Implement actual test
+        cam = self._current_camera()
+        rack, slot = (cam.plc.rack, cam.plc.slot) if cam is not None else (0, 2)
+        
+        def on_done(result):
+            ok, errors = result
+            if ok:
+                messagebox.showinfo("Test PLC", f"Kết nối PLC thành công\n{ip}", parent=self)
+            else:
+                detail = "\n".join(errors[-2:])
+                messagebox.showerror("Test PLC", f"Không thể kết nối PLC {ip}\n{detail}", parent=self)
+        
+        self._run_probe('plc', _probe_plc, (ip, rack, slot), on_done)
+    
+    def _run_probe(self, kind: str, fn: Callable, args: tuple, on_done: Callable) -> None:
+        """Chạy fn(*args) trên luồng probe, gọi on_done(kết quả) trên luồng Tk"""
+        if kind in self._probe_polls:
+            return  # Đang test, bỏ qua click lặp
+        
+        fut = self._probe_executor.submit(fn, *args)
+        self._probe_polls[kind] = self.after(100, self._poll_probe, fut, kind, on_done)
+        self._set_probe_button(kind, tk.DISABLED)
+    
+    def _set_probe_button(self, kind: str, state: str) -> None:
+        """Bật/tắt nút Test của loại probe (nếu tab chứa nút đã dựng)"""
+        btn = self._probe_buttons.get(kind)
+        if btn is not None:
+            btn.configure(state=state)
+    
+    def _poll_probe(self, fut: Future, kind: str, on_done: Callable) -> None:
+        """Kiểm tra probe (không chặn), hẹn lại nếu chưa xong"""
+        if not fut.done():
+            self._probe_polls[kind] = self.after(100, self._poll_probe, fut, kind, on_done)
+            return
+        
+        self._probe_polls.pop(kind, None)
+        self._set_probe_button(kind, tk.NORMAL)
+        try:
+            result = fut.result()
+        except Exception as e:
+            messagebox.showerror("Lỗi", f"Test {kind} thất bại:\n{str(e)}", parent=self)
+            return
+        on_done(result)
     
     def _open_roi_editor(self, roi_type: str):
         """Mở editor để vẽ ROI"""
-        messagebox.showinfo("ROI Editor", 
-            f"Sẽ mở cửa sổ vẽ vùng {roi_type}.\n"
-            "Click chuột để đặt các điểm, nhấn Enter để hoàn thành.")
-        # TODO: Implement ROI editor
+        cam = self._current_camera()
+        if cam is None:
+            messagebox.showwarning("Cảnh báo", "Vui lòng chọn camera!")
+            return
+        
+        source = self.cam_rtsp_var.get() or cam.get_video_source()
+        cached = self._roi_frames.get(cam.camera_id)
+        if cached is not None and cached[0] == source:
+            self._roi_frames.move_to_end(cam.camera_id)
+            self._show_roi_editor(cam, roi_type, cached[1])
+            return
+        
+        def on_done(frame):
+            if frame is None:
+                messagebox.showerror("Lỗi", f"Không thể kết nối đến camera:\n{source}", parent=self)
+                return
+            self._cache_roi_frame(cam.camera_id, source, frame)
+            self._show_roi_editor(cam, roi_type, frame)
+        
+        # Đọc frame trên luồng probe để không treo GUI khi camera chậm/mất kết nối
+        self._run_probe('camera', _probe_camera, (source,), on_done)
     
-    def _add_model(self):
-        """Thêm model mới"""
+    def _show_roi_editor(self, cam, roi_type: str, frame) -> None:
+        """Mở ROIEditor trên frame đã lấy được của camera"""
+        from .roi_editor import ROIEditor
+        
+        h, w = frame.shape[:2]
+        roi = cam.roi
+        ref_w, ref_h = roi.reference_resolution
+        points = roi.roi_coal if roi_type == 'coal' else roi.roi_person
+        
+        def on_save(new_points):
+            # Điểm của editor theo kích thước frame -> đổi về độ phân giải tham chiếu
+            scaled = [(int(x * ref_w / w), int(y * ref_h / h)) for (x, y) in new_points]
+            if roi_type == 'coal':
+                roi.roi_coal = scaled
+            else:
+                roi.roi_person = scaled
+            self._mark_modified()
+        
+        ROIEditor(
+            parent=self,
+            frame=frame,
+            roi_type=roi_type,
+            initial_points=roi.scale_roi(points, w, h),
+            on_save=on_save
+        )
+    
+    def _current_camera(self):
+        """CameraConfig đang chọn trong danh sách (None nếu chưa chọn)"""
+        if not self._tab_built(self.cameras_frame):
+            return None
+        selection = self.camera_listbox.curselection()
+        if selection and selection[0] < len(self.config.cameras):
+            return self.config.cameras[selection[0]]
+        return None
+    
+    def _cache_roi_frame(self, camera_id: str, source: str, frame) -> None:
+        """Lưu frame để vẽ ROI lần sau (LRU 16 camera)"""
+        self._roi_frames[camera_id] = (source, frame)
+        self._roi_frames.move_to_end(camera_id)
+        while len(self._roi_frames) > 16:
+            self._roi_frames.popitem(last=False)
+    
+    def _on_rtsp_changed(self, *args):
+        cam = self._current_camera()
+        if cam is None:
+            return
+        cached = self._roi_frames.get(cam.camera_id)
+        if cached is not None and cached[0] != self.cam_rtsp_var.get():
+            del self._roi_frames[cam.camera_id]
+    
+    def _scan_models(self):
+        """Quét MODELS_DIR (luồng nền) lấy các model mới nhất cho hộp chọn nhanh"""
+        paths = [model_cfg.path for model_cfg in self.config.models.values()]
+        try:
+            entries = [
+                (entry.stat().st_mtime, entry.path)
+                for entry in os.scandir(self.MODELS_DIR)
+                if entry.is_file() and entry.name.lower().endswith(self.MODEL_EXTS)
+            ]
+        except OSError:
+            entries = []
+        entries.sort(reverse=True)
+        
+        seen = set()
+        for path in paths + [path for _, path in entries]:
+            if path not in seen:
+                seen.add(path)
+                self._recent_models.append(path)
+    
+    def _ask_model_path(self) -> Optional[str]:
+        """Chọn file model: danh sách model gần đây, "Duyệt..." mở filedialog đầy đủ"""
+        recent = list(self._recent_models)
+        if not recent:
+            return self._ask_model_file()
+        
+        result: List[Optional[str]] = [None]
+        dialog = tk.Toplevel(self)
+        dialog.title("Chọn file model")
+        dialog.configure(bg='#34495e')
+        dialog.transient(self)
+        
+        listbox = tk.Listbox(dialog, bg='#2c3e50', fg='white', selectbackground='#3498db',
+                             font=('Arial', 10), width=60, height=min(len(recent), 12))
+        listbox.insert(tk.END, *recent)
+        listbox.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        def choose(event=None):
+            selection = listbox.curselection()
+            if selection:
+                result[0] = recent[selection[0]]
+                dialog.destroy()
+        
+        def browse():
+            dialog.destroy()
+            result[0] = self._ask_model_file()
+        
+        listbox.bind('<Double-Button-1>', choose)
+        listbox.bind('<Return>', choose)
+        
+        btn_frame = tk.Frame(dialog, bg='#34495e')
+        btn_frame.pack(fill=tk.X, padx=10, pady=(0, 10))
+        tk.Button(btn_frame, text="Chọn", command=choose,
+                 bg='#27ae60', fg='white', width=10).pack(side=tk.RIGHT, padx=5)
+        tk.Button(btn_frame, text="Duyệt...", command=browse,
+                 bg='#3498db', fg='white', width=10).pack(side=tk.RIGHT, padx=5)
+        
+        dialog.grab_set()
+        listbox.focus_set()
+        self.wait_window(dialog)
+        # Trả lại grab cho ConfigPanel (modal)
+        if self.winfo_exists():
+            self.grab_set()
+        return result[0]
+    
+    def _ask_model_file(self) -> Optional[str]:
         path = filedialog.askopenfilename(
             title="Chọn file model",
-            filetypes=[("PyTorch Model", "*.pt"), ("All files", "*.*")]
+            filetypes=[("PyTorch Model", "*.pt"), ("All files", "*.*")],
+            parent=self
         )
+        return path or None
+    
+    def _add_model(self):
+        """Thêm model mới"""
+        path = self._ask_model_path()
         if path:
             name = simpledialog.askstring("Tên Model", "Nhập tên cho model:", parent=self)
             if name:
                 cameras = simpledialog.askstring("Cameras", 
                     "Nhập số camera sử dụng model này (ví dụ: 1,2,3):", parent=self)
                 # TODO: Add to config
-                self.modified = True
+                self._mark_modified()
     
     def _edit_model(self):
         """Sửa model"""
@@ -455,14 +1259,11 @@ class ConfigPanel(tk.Toplevel):
         selection = self.models_tree.selection()
         if selection:
             if messagebox.askyesno("Xác nhận", "Bạn có chắc muốn xóa model này?"):
-                self.modified = True
+                self._mark_modified()
     
     def _browse_model(self):
         """Chọn file model"""
-        path = filedialog.askopenfilename(
-            title="Chọn file model",
-            filetypes=[("PyTorch Model", "*.pt"), ("All files", "*.*")]
-        )
+        path = self._ask_model_path()
         if path:
             messagebox.showinfo("Model", f"Đã chọn: {path}")
     
@@ -480,7 +1281,17 @@ class ConfigPanel(tk.Toplevel):
             filetypes=[("JSON files", "*.json")]
         )
         if path:
-            # TODO: Save config to file
+            try:
+                if self._config_dirty or self._config_json_cache is None:
+                    data = self.config.to_dict()
+                    data["section_versions"] = _SECTION_VERSIONS
+                    self._config_json_cache = _json_dumps(data)
+                    self._config_dirty = False
+                with open(path, 'wb') as f:
+                    f.write(self._config_json_cache)
+            except Exception as e:
+                messagebox.showerror("Lỗi", f"Không thể xuất cấu hình:\n{str(e)}")
+                return
             messagebox.showinfo("Thành công", f"Đã xuất cấu hình ra:\n{path}")
     
     def _import_config(self):
@@ -491,14 +1302,39 @@ class ConfigPanel(tk.Toplevel):
         )
         if path:
             if messagebox.askyesno("Xác nhận", "Cấu hình hiện tại sẽ bị ghi đè. Tiếp tục?"):
-                # TODO: Load config from file
+                try:
+                    data = self._read_config_file(path)
+                    self.config = SystemConfig.from_dict(data)
+                except Exception as e:
+                    messagebox.showerror("Lỗi", f"Không thể nhập cấu hình:\n{str(e)}")
+                    return
+                self._mark_modified()
+                self._load_current_config()
                 messagebox.showinfo("Thành công", "Đã nhập cấu hình thành công!")
     
+    def _read_config_file(self, path: str) -> dict:
+        """Đọc file config, dùng lại kết quả parse nếu file không đổi (mtime)"""
+        mtime = os.path.getmtime(path)
+        cached = self._import_cache
+        if cached is not None and cached[0] == path and cached[1] == mtime:
+            return cached[2]
+        
+        with open(path, 'rb') as f:
+            data = _json_loads(f.read())
+        
+        # File cũ không có section_versions -> coi như phiên bản 1
+        versions = data.pop("section_versions", None) or {}
+        for section, version in versions.items():
+            if version > _SECTION_VERSIONS.get(section, version):
+                raise ValueError(f"Phần '{section}' có phiên bản {version} chưa được hỗ trợ")
+        self._import_cache = (path, mtime, data)
+        return data
+    
     def _reset_defaults(self):
         """Reset về mặc định"""
         if messagebox.askyesno("Xác nhận", "Reset tất cả về cấu hình mặc định?"):
             # TODO: Reset config
-            self.modified = True
+            self._mark_modified()
     
     def _save_config(self):
         """Lưu cấu hình"""
@@ -10,15 +10,17 @@ import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox, filedialog
 from typing import Optional, Dict, List
 import threading
-import datetime
 import time
 import json
 import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import numpy as np
-from PIL import Image, ImageTk
+from PIL import Image
 
 from ..config import SystemConfig, CameraConfig, save_config, load_config
+from ..core import WorkerStatus
 
 
 # ==================== Colors ====================
@@ -38,9 +40,59 @@ COLORS = {
 
 FONT = 'Segoe UI'
 
+# Trạng thái worker -> trạng thái hiển thị trên header panel (còn lại = offline)
+_PANEL_STATUS = {
+    WorkerStatus.RUNNING: "online",
+    WorkerStatus.RECONNECTING: "reconnecting",
+    WorkerStatus.STARTING: "connecting",
+}
+
+
+def _hex_rgb(color: str) -> tuple:
+    """'#rrggbb' -> (r, g, b)"""
+    return tuple(int(color[i:i+2], 16) for i in (1, 3, 5))
+
+
+def load_preview_jpeg(path: str, target_size: tuple) -> Optional[np.ndarray]:
+    """Load ảnh JPEG để preview, decode thẳng ở kích thước nhỏ
+    
+    Image.draft() cho decoder JPEG scale 1/2, 1/4, 1/8 ngay khi decode (ít
+    tính toán và bộ nhớ hơn decode full-res rồi mới thu nhỏ).
+    
+    Args:
+        path: Đường dẫn file ảnh
+        target_size: (width, height) cần hiển thị
+        
+    Returns:
+        Mảng RGB (h, w, 3) uint8 (>= target_size nếu ảnh đủ lớn) hoặc None nếu lỗi
+    """
+    try:
+        with Image.open(path) as img:
+            img.draft('RGB', tuple(target_size))
+            return np.asarray(img.convert('RGB'))
+    except Exception:
+        return None
+
 
 class CameraPanel(tk.Frame):
-    """Panel hiển thị 1 camera - kích thước cố định"""
+    """Panel hiển thị 1 camera - kích thước cố định
+    
+    Header (tên + trạng thái) và footer (FPS/than/người) là Label Tk (giữ
+    tiếng Việt có dấu); video nạp vào PhotoImage của 1 Label riêng.
+    """
+    
+    HEADER_H = 24
+    FOOTER_H = 20
+    PAD = 4  # Khoảng cách từ video tới viền panel
+    
+    # status -> (text, màu)
+    STATUS_STYLE = {
+        "online": ("🟢 Online", COLORS['success']),
+        "connecting": ("🟡 Kết nối...", COLORS['warning']),
+        "reconnecting": ("🟡 Reconnect...", COLORS['warning']),
+        "alarm": ("🔴 ALARM!", COLORS['error']),
+        "offline": ("⚪ Offline", COLORS['text_gray']),
+    }
     
     def __init__(self, parent, cam_id: int, cam_name: str, width=420, height=280):
         super().__init__(parent, bg=COLORS['bg_panel'], width=width, height=height,
@@ -52,10 +104,20 @@ class CameraPanel(tk.Frame):
         self.width = width
         self.height = height
         
-        # Frame storage (như coal_6cam_v1.py)
-        self._display_frame = None
-        self._frame_lock = threading.Lock()
-        self._photo = None
+        # Frame storage - 1 buffer video cấp phát sẵn: update_frame copy vào,
+        # process_display nạp thẳng vào PhotoImage (cùng main thread)
+        self._slot = None
+        self._dirty = False  # Có frame mới chưa nạp vào PhotoImage
+        self._ingress_warned = False
+        
+        # Buffer video cố định - cấp phát 1 lần, mỗi frame chỉ ghi đè nội dung
+        self._disp_w = 0
+        self._disp_h = 0
+        # 2 PhotoImage luân phiên: nạp vào ảnh không hiển thị rồi mới gán cho Label
+        self._photos = []
+        self._photo_idx = 0
+        self._ppm_header = b""  # Header P6 cho kích thước video hiện tại
+        self._has_frame = False  # Đã hiển thị frame (chưa có -> text "Chưa kết nối")
         
         # State
         self.connection_status = "offline"
@@ -64,6 +126,7 @@ class CameraPanel(tk.Frame):
         self.person_detected = False
         self.person_alarm = False
         self.coal_alarm = False
+        self._info_shown = None  # (fps, coal_ratio, person) đang hiển thị ở footer
         
         # ROI data (để vẽ)
         self.roi_person = []
@@ -71,34 +134,88 @@ class CameraPanel(tk.Frame):
         self.roi_reference = (1920, 1080)
         
         self._create_ui()
+        self._alloc_display(width, height)
+        self.bind('<Configure>', self._on_resize)
     
     def _create_ui(self):
-        """Tạo UI"""
+        """Tạo UI - header, Label video (PhotoImage) và footer"""
         # Header
-        header = tk.Frame(self, bg=COLORS['bg_panel'], height=24)
+        header = tk.Frame(self, bg=COLORS['bg_panel'], height=self.HEADER_H)
         header.pack(fill=tk.X)
         header.pack_propagate(False)
         
         tk.Label(header, text=f"📹 Camera {self.cam_id}", font=(FONT, 9, 'bold'),
                 bg=COLORS['bg_panel'], fg=COLORS['accent']).pack(side=tk.LEFT, padx=5)
         
-        self.status_lbl = tk.Label(header, text="⚪ Offline", font=(FONT, 8),
-                                   bg=COLORS['bg_panel'], fg=COLORS['text_gray'])
+        text, color = self.STATUS_STYLE["offline"]
+        self.status_lbl = tk.Label(header, text=text, font=(FONT, 8),
+                                   bg=COLORS['bg_panel'], fg=color)
         self.status_lbl.pack(side=tk.RIGHT, padx=5)
         
+        # Footer (pack trước video để luôn giữ chỗ ở đáy panel)
+        self.info_lbl = tk.Label(self, text="FPS: -- | Than: --% | Người: --", font=(FONT, 8),
+                                 bg=COLORS['bg_panel'], fg=COLORS['text_gray'],
+                                 anchor=tk.W, height=1)
+        self.info_lbl.pack(side=tk.BOTTOM, fill=tk.X, padx=5)
+        
         # Video
         self.video_lbl = tk.Label(self, text=f"Camera {self.cam_id}\n{self.cam_name}\nChưa kết nối",
-                                  font=(FONT, 10), bg=COLORS['bg_video'], fg=COLORS['text_gray'])
-        self.video_lbl.pack(fill=tk.BOTH, expand=True, padx=2, pady=2)
+                                  font=(FONT, 10), bg=COLORS['bg_video'], fg=COLORS['text_gray'],
+                                  bd=0, highlightthickness=0)
+        self.video_lbl.pack(fill=tk.BOTH, expand=True, padx=self.PAD, pady=2)
+    
+    def _alloc_display(self, panel_w: int, panel_h: int):
+        """Cấp phát slot/PhotoImage cho kích thước vùng video của panel"""
+        disp_w = max(10, panel_w - 2 * self.PAD)
+        disp_h = max(10, panel_h - self.HEADER_H - self.FOOTER_H - 4)
+        if disp_w == self._disp_w and disp_h == self._disp_h:
+            return
+        self._disp_w = disp_w
+        self._disp_h = disp_h
         
-        # Footer
-        footer = tk.Frame(self, bg=COLORS['bg_panel'], height=20)
-        footer.pack(fill=tk.X)
-        footer.pack_propagate(False)
+        base = np.empty((disp_h, disp_w, 3), dtype=np.uint8)
+        base[:] = _hex_rgb(COLORS['bg_video'])
+        self._slot = base
         
-        self.info_lbl = tk.Label(footer, text="FPS: -- | Than: --% | Người: --", font=(FONT, 8),
-                                 bg=COLORS['bg_panel'], fg=COLORS['text_gray'])
-        self.info_lbl.pack(side=tk.LEFT, padx=5)
+        self._init_photo_pool()
+        if self._has_frame:
+            self._paint(self._slot)
+    
+    def _init_photo_pool(self):
+        """Cấp phát 2 PhotoImage kích thước video (giữ đến khi đổi kích thước)"""
+        self._photos = [tk.PhotoImage(master=self, width=self._disp_w, height=self._disp_h)
+                        for _ in range(2)]
+        self._ppm_header = b"P6\n%d %d\n255\n" % (self._disp_w, self._disp_h)
+        self._photo_idx = 0
+    
+    @property
+    def display_size(self) -> tuple:
+        """(width, height) vùng video - worker letterbox frame theo kích thước này"""
+        return (self._disp_w, self._disp_h)
+    
+    def _on_resize(self, event):
+        """Panel đổi kích thước -> cấp phát lại buffer (hiếm khi xảy ra)"""
+        if event.widget is self and event.width >= 100 and event.height >= 100:
+            self._alloc_display(event.width, event.height)
+    
+    def _render_footer(self) -> str:
+        """Text footer: FPS | Than | Người"""
+        fps, coal_ratio, person = self._info_shown
+        return f"FPS: {fps:.0f} | Than: {coal_ratio:.1f}% | Người: {'Có' if person else 'Không'}"
+    
+    def _paint(self, slot: np.ndarray):
+        """Nạp slot video vào PhotoImage"""
+        # PPM thô (header + buffer slot, join 1 lần copy) nạp thẳng vào
+        # PhotoImage đang không hiển thị rồi mới đổi Label sang ảnh đó
+        idx = 1 - self._photo_idx
+        photo = self._photos[idx]
+        photo.configure(data=b"".join((self._ppm_header, slot.data)), format='PPM')
+        if self._has_frame:
+            self.video_lbl.configure(image=photo)
+        else:
+            self.video_lbl.configure(image=photo, text='')
+            self._has_frame = True
+        self._photo_idx = idx
     
     def set_roi(self, roi_person: list, roi_coal: list, reference: tuple):
         """Set ROI để vẽ"""
@@ -107,9 +224,29 @@ class CameraPanel(tk.Frame):
         self.roi_reference = reference
     
     def update_frame(self, frame: np.ndarray):
-        """Cập nhật frame (thread-safe)"""
-        with self._frame_lock:
-            self._display_frame = frame
+        """Cập nhật frame (main thread) - copy vào buffer video của panel
+        
+        Args:
+            frame: Frame RGB đã letterbox sẵn, shape (disp_h, disp_w, 3)
+        """
+        # Bỏ qua frame cũ khác kích thước (vừa resize panel)
+        if frame.shape[0] != self._disp_h or frame.shape[1] != self._disp_w:
+            return
+        # Frame phải là uint8 liên tục - báo 1 lần để sửa ở producer
+        if frame.dtype != np.uint8:
+            self._warn_ingress(f"dtype {frame.dtype} (cần uint8), bỏ qua frame")
+            return
+        if not frame.flags['C_CONTIGUOUS']:
+            self._warn_ingress("frame không liên tục (C_CONTIGUOUS), đã chuyển đổi")
+            frame = np.ascontiguousarray(frame)
+        np.copyto(self._slot, frame)
+        self._dirty = True
+    
+    def _warn_ingress(self, msg: str):
+        """In cảnh báo frame đầu vào 1 lần cho mỗi panel"""
+        if not self._ingress_warned:
+            self._ingress_warned = True
+            print(f"[WARN] Camera {self.cam_id}: {msg}")
     
     def update_stats(self, fps: float, coal_ratio: float, person_detected: bool = False):
         """Cập nhật thống kê"""
@@ -131,99 +268,33 @@ class CameraPanel(tk.Frame):
             self.config(highlightthickness=0)
     
     def set_status(self, status: str):
-        """Set trạng thái kết nối"""
+        """Set trạng thái kết nối - chỉ cập nhật label khi đổi"""
+        if status == self.connection_status:
+            return  # Không đổi - không config lại label
         self.connection_status = status
-        status_map = {
-            "online": ("🟢 Online", COLORS['success']),
-            "connecting": ("🟡 Kết nối...", COLORS['warning']),
-            "reconnecting": ("🟡 Reconnect...", COLORS['warning']),
-            "alarm": ("🔴 ALARM!", COLORS['error']),
-            "offline": ("⚪ Offline", COLORS['text_gray']),
-        }
-        text, color = status_map.get(status, ("⚪ Offline", COLORS['text_gray']))
+        text, color = self.STATUS_STYLE.get(status, self.STATUS_STYLE["offline"])
         self.status_lbl.config(text=text, fg=color)
     
     def process_display(self):
-        """Xử lý và hiển thị frame (gọi từ main thread) - tham khảo coal_12_12_v1.py"""
-        with self._frame_lock:
-            if self._display_frame is None:
-                return
-            frame = self._display_frame.copy()
-            self._display_frame = None
+        """Hiển thị frame (gọi từ main thread) - tham khảo coal_12_12_v1.py
+        
+        Frame đã được worker letterbox + convert RGB và update_frame đã copy
+        vào slot; ở đây chỉ cập nhật footer nếu cần rồi nạp vào PhotoImage.
+        """
+        if not self._dirty:
+            return
+        self._dirty = False
         
         try:
-            # Kiểm tra frame có hợp lệ không
-            if frame is None:
-                return
-            
-            # Lấy kích thước thực tế của widget (không hardcode)
-            self.video_lbl.update_idletasks()
-            parent = self.video_lbl.master  # CameraPanel frame
-            parent.update_idletasks()
-            
-            # Lấy kích thước khung hình camera (trừ padding)
-            max_width = parent.winfo_width() - 8  # Trừ padding
-            max_height = parent.winfo_height() - 48  # Trừ header và footer
-            
-            # Nếu chưa có kích thước hợp lệ, dùng giá trị từ config
-            if max_width < 100 or max_height < 100:
-                max_width = self.width - 8
-                max_height = self.height - 48
-            
-            # Lấy kích thước gốc của frame
-            h, w = frame.shape[:2]
-            
-            # Kiểm tra frame có hợp lệ không
-            if w <= 0 or h <= 0:
-                return
-            
-            # Tính tỷ lệ scale để giữ nguyên aspect ratio
-            scale_x = max_width / w
-            scale_y = max_height / h
-            scale = min(scale_x, scale_y)  # Lấy scale nhỏ hơn để fit hoàn toàn
-            
-            # Giới hạn scale để tránh quá nhỏ hoặc quá lớn
-            scale = max(0.1, min(scale, 3.0))
-            
-            # Tính kích thước mới
-            new_w = int(w * scale)
-            new_h = int(h * scale)
+            # Info - chỉ vẽ lại footer khi giá trị đổi đáng kể
+            shown = self._info_shown
+            if (shown is None or abs(self.fps - shown[0]) > 0.5
+                    or abs(self.coal_ratio - shown[1]) >= 1.0
+                    or self.person_detected != shown[2]):
+                self._info_shown = (self.fps, self.coal_ratio, self.person_detected)
+                self.info_lbl.config(text=self._render_footer())
             
-            # Đảm bảo kích thước mới không quá nhỏ
-            if new_w < 10 or new_h < 10:
-                new_w = max(10, new_w)
-                new_h = max(10, new_h)
-            
-            # Resize frame với interpolation tốt
-            if scale < 1.0:
-                # Thu nhỏ - dùng INTER_AREA để tránh aliasing
-                frame_resized = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_AREA)
-            else:
-                # Phóng to - dùng INTER_LINEAR
-                frame_resized = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
-            
-            # Tạo canvas với video ở giữa (nền đen)
-            canvas = np.zeros((max_height, max_width, 3), dtype=np.uint8)
-            
-            # Căn giữa video trong khung hình
-            y_off = (max_height - new_h) // 2
-            x_off = (max_width - new_w) // 2
-            
-            # Đảm bảo offset không âm
-            y_off = max(0, y_off)
-            x_off = max(0, x_off)
-            
-            # Đặt video đã resize vào giữa canvas
-            canvas[y_off:y_off+new_h, x_off:x_off+new_w] = frame_resized
-            
-            # Convert
-            rgb = cv2.cvtColor(canvas, cv2.COLOR_BGR2RGB)
-            self._photo = ImageTk.PhotoImage(Image.fromarray(rgb))
-            self.video_lbl.configure(image=self._photo, text='')
-            
-            # Info
-            person_text = "Có" if self.person_detected else "Không"
-            self.info_lbl.config(text=f"FPS: {self.fps:.0f} | Than: {self.coal_ratio:.1f}% | Người: {person_text}")
+            self._paint(self._slot)
             
         except Exception as e:
             pass
@@ -255,21 +326,78 @@ class MainWindow:
         self._app = None
         self._camera_panels: Dict[str, CameraPanel] = {}
         
+        # Panel có frame mới trong lượt hiện tại + seq frame đã nhận từ worker
+        self._dirty_panels = set()
+        self._last_src_seq: Dict[int, int] = {}
+        # Worker báo frame mới qua _on_worker_frame (thread worker) -> chỉ gom
+        # cam_id vào _frame_ready, _fast_tick lấy cả lô ở main thread
+        # (thread worker không gọi Tk nên không phụ thuộc main loop)
+        self._frame_ready = set()
+        self._deliver_lock = threading.Lock()
+        # Camera đã báo lỗi giao frame (chỉ log 1 lần mỗi camera)
+        self._frame_errors = set()
+        # Throttle tùy chọn theo camera (giây giữa 2 lần nhận frame, không có = không giới hạn)
+        self._panel_min_interval: Dict[int, float] = {}
+        self._last_panel_update: Dict[int, float] = {}
+        # Camera đã in debug frame đầu tiên (chỉ dùng khi config.debug_frames)
+        self._debug_frames = config.debug_frames
+        self._debug_seen = set()
+        # 2 timer: nhanh cho log (30Hz), chậm cho đồng hồ/thống kê/trạng thái
+        # camera (1Hz là đủ) - video do worker đẩy sang, không poll
+        self._fast_interval_ms = 33
+        self._slow_interval_ms = 1000
+        # Lỗi cuối cùng của _slow_tick (không log lặp lại mỗi giây)
+        self._last_tick_error = None
+        
+        # Log chờ ghi ra widget (producer ở nhiều thread, append an toàn với GIL)
+        # _fast_tick ghi tối đa _log_flush_max dòng/lần để không chặn vẽ video
+        self._log_queue = deque(maxlen=2000)
+        self._log_flush_max = 200
+        # Số dòng đang có trong _log_text/_sys_log - cắt theo khối khi vượt
+        # max_log_lines + _log_trim_chunk (không hỏi Tk index mỗi lần ghi)
+        self._log_lines = 0
+        self._sys_log_lines = 0
+        self._log_trim_chunk = 50
+        # Log sinh ra trước khi tab Hệ thống được dựng (_sys_log tạo lười) -
+        # giữ tối đa max_log_lines dòng, ghi vào widget khi tab được mở
+        self._sys_log_pending = deque(maxlen=max(1, config.max_log_lines))
+        # (giây, "HH:MM:SS") - strftime chỉ chạy khi sang giây mới; lưu tuple
+        # để thread khác luôn đọc được cặp giá trị khớp nhau
+        self._last_ts = (0, '')
+        # StringVar cho các label trạng thái (đồng hồ, cameras, cảnh báo, uptime)
+        # + text đang hiển thị - chỉ set() khi đổi
+        self._status_vars: Dict[str, tk.StringVar] = {}
+        self._last_status_text: Dict[str, str] = {}
+        
         # State
         self._is_monitoring = False
         self._start_time = None
         
+        # Thread nền dùng chung cho tác vụ chặn (load model, test PLC) - kết quả
+        # trả về main thread qua root.after; _start_future/_stop_future chặn bấm
+        # Start khi đang khởi động hoặc đang dừng
+        self._bg = ThreadPoolExecutor(max_workers=2, thread_name_prefix="gui-bg")
+        self._start_future = None
+        self._stop_future = None
+        self._closing = False
+        
         # Config widgets (để lưu giá trị)
         self._config_widgets = {}
         
+        # Ghi config trễ: nhiều lần bấm Lưu liên tiếp -> chỉ ghi file 1 lần
+        self._config_dirty = False
+        self._config_save_after_id = None
+        self._config_save_delay_ms = 500
+        
         # Create UI
         self._create_ui()
         
         # Auto-start monitoring
         self.root.after(1000, self._auto_start_monitoring)
         
-        # GUI loop
-        self._update_loop()
+        # GUI loops
+        self._fast_tick()
+        self._slow_tick()
     
     def _create_ui(self):
         """Tạo UI chính"""
@@ -284,11 +412,15 @@ class MainWindow:
         self._main_container = tk.Frame(self.root, bg=COLORS['bg_dark'])
         self._main_container.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
+        # Tab cấu hình chỉ tạo khi được chọn lần đầu (lazy)
+        self._tab_builders = {
+            "monitor": self._create_monitor_tab,
+            "cameras": self._create_camera_config_tab,
+            "detection": self._create_detection_config_tab,
+            "plc": self._create_plc_config_tab,
+            "system": self._create_system_tab,
+        }
         self._create_monitor_tab()
-        self._create_camera_config_tab()
-        self._create_detection_config_tab()
-        self._create_plc_config_tab()
-        self._create_system_tab()
         
         self._show_tab("monitor")
     
@@ -305,7 +437,8 @@ class MainWindow:
                                        bg=COLORS['bg_panel'], fg=COLORS['text_white'])
         self._global_status.pack(side=tk.RIGHT, padx=15)
         
-        self._time_lbl = tk.Label(header, text="", font=(FONT, 10),
+        self._status_vars["time"] = tk.StringVar(master=self.root, value="")
+        self._time_lbl = tk.Label(header, textvariable=self._status_vars["time"], font=(FONT, 10),
                                   bg=COLORS['bg_panel'], fg=COLORS['text_light'])
         self._time_lbl.pack(side=tk.RIGHT, padx=15)
     
@@ -341,6 +474,8 @@ class MainWindow:
             btn.config(bg=COLORS['bg_panel'] if t == tid else COLORS['bg_dark'],
                       fg=COLORS['accent'] if t == tid else COLORS['text_gray'])
         self._current_tab = tid
+        if tid not in self._tab_frames:
+            self._tab_builders[tid]()
         self._show_tab(tid)
     
     def _show_tab(self, tid: str):
@@ -418,7 +553,8 @@ class MainWindow:
         self._status_lbls = {}
         for key, text in [("cameras", "Cameras: 0/0"), ("person", "Cảnh báo người: 0"),
                           ("coal", "Cảnh báo than: 0"), ("uptime", "Uptime: 00:00:00")]:
-            lbl = tk.Label(status, text=text, font=(FONT, 9), bg=COLORS['bg_panel'],
+            var = self._status_vars[key] = tk.StringVar(master=self.root, value=text)
+            lbl = tk.Label(status, textvariable=var, font=(FONT, 9), bg=COLORS['bg_panel'],
                           fg=COLORS['text_white'], anchor='w')
             lbl.pack(anchor=tk.W, padx=10, pady=2)
             self._status_lbls[key] = lbl
@@ -708,11 +844,17 @@ class MainWindow:
         self._sys_log = scrolledtext.ScrolledText(log_frame, bg=COLORS['bg_video'],
                                                   fg=COLORS['text_white'], font=('Consolas', 9))
         self._sys_log.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        if self._sys_log_pending:
+            lines = list(self._sys_log_pending)
+            self._sys_log_pending.clear()
+            text = ''.join(lines)
+            self._sys_log_lines = self._write_log(self._sys_log, 0, lines, text, text.count('\n'))
+            self._sys_log.see(tk.END)
         
         btn_row = tk.Frame(log_frame, bg=COLORS['bg_panel'])
         btn_row.pack(fill=tk.X, padx=5, pady=5)
         tk.Button(btn_row, text="🗑️ Xóa log", bg=COLORS['error'], fg='white',
-                 command=lambda: self._sys_log.delete(1.0, tk.END)).pack(side=tk.LEFT, padx=5)
+                 command=self._clear_sys_log).pack(side=tk.LEFT, padx=5)
     
     # ==================== Config Save/Load Functions ====================
     def _save_camera_config(self):
@@ -724,7 +866,7 @@ class MainWindow:
                     self.config.cameras[i].rtsp_url = widgets['rtsp'].get()
                     self.config.cameras[i].enabled = widgets['enabled'].get()
             
-            save_config(self.config, self.config_path)
+            self._schedule_config_save()
             self._add_log("✅ Đã lưu cấu hình Camera!")
             messagebox.showinfo("Thành công", "Đã lưu cấu hình Camera!\nKhởi động lại để áp dụng thay đổi RTSP URL.")
         except Exception as e:
@@ -745,7 +887,7 @@ class MainWindow:
                 cam.detection.confidence_threshold = float(widgets['confidence'].get())
                 cam.detection.coal_detection_enabled = widgets['coal_enabled'].get()
             
-            save_config(self.config, self.config_path)
+            self._schedule_config_save()
             self._add_log("✅ Đã lưu cấu hình Detection!")
             messagebox.showinfo("Thành công", "Đã lưu cấu hình Detection!\nThay đổi sẽ áp dụng ngay.")
         except Exception as e:
@@ -772,39 +914,78 @@ class MainWindow:
                     cam.plc.coal_alarm_byte = int(coal_addr[0])
                     cam.plc.coal_alarm_bit = int(coal_addr[1]) if len(coal_addr) > 1 else 1
             
-            save_config(self.config, self.config_path)
+            self._schedule_config_save()
             self._add_log("✅ Đã lưu cấu hình PLC!")
             messagebox.showinfo("Thành công", "Đã lưu cấu hình PLC!\nKhởi động lại để áp dụng.")
         except Exception as e:
             self._add_log(f"❌ Lỗi lưu: {str(e)}")
             messagebox.showerror("Lỗi", f"Không thể lưu: {str(e)}")
     
+    def _schedule_config_save(self):
+        """Đánh dấu config đã đổi và hẹn ghi file sau _config_save_delay_ms"""
+        self._config_dirty = True
+        if self._config_save_after_id is not None:
+            self.root.after_cancel(self._config_save_after_id)
+        self._config_save_after_id = self.root.after(self._config_save_delay_ms, self._flush_config)
+    
+    def _flush_config(self):
+        """Ghi config ra file ngay nếu còn thay đổi chưa ghi"""
+        if self._config_save_after_id is not None:
+            self.root.after_cancel(self._config_save_after_id)
+            self._config_save_after_id = None
+        if not self._config_dirty:
+            return
+        self._config_dirty = False
+        try:
+            save_config(self.config, self.config_path)
+        except Exception as e:
+            self._add_log(f"❌ Lỗi lưu: {str(e)}")
+            messagebox.showerror("Lỗi", f"Không thể lưu: {str(e)}")
+    
     def _test_plc(self):
-        """Test kết nối PLC"""
+        """Test kết nối PLC (connect chạy ở thread nền, không treo GUI)"""
         try:
-            import snap7
             ip = self._config_widgets['plc']['ip'].get()
             rack = int(self._config_widgets['plc']['rack'].get())
             slot = int(self._config_widgets['plc']['slot'].get())
-            
-            client = snap7.client.Client()
-            client.connect(ip, rack, slot)
-            
-            if client.get_connected():
-                self._add_log(f"✅ Kết nối PLC thành công: {ip}")
-                messagebox.showinfo("Thành công", f"Kết nối PLC thành công!\nIP: {ip}\nRack: {rack}\nSlot: {slot}")
-                client.disconnect()
-            else:
-                raise Exception("Không thể kết nối")
         except Exception as e:
             self._add_log(f"❌ Lỗi kết nối PLC: {str(e)}")
             messagebox.showerror("Lỗi", f"Không thể kết nối PLC:\n{str(e)}")
+            return
+        
+        future = self._bg.submit(self._do_test_plc, ip, rack, slot)
+        future.add_done_callback(
+            lambda f: self._post(self._after_test_plc, f, ip, rack, slot))
+    
+    @staticmethod
+    def _do_test_plc(ip: str, rack: int, slot: int):
+        """Connect thử PLC (chạy trong thread nền)"""
+        import snap7
+        client = snap7.client.Client()
+        client.connect(ip, rack, slot)
+        
+        if not client.get_connected():
+            raise Exception("Không thể kết nối")
+        client.disconnect()
+    
+    def _after_test_plc(self, future, ip: str, rack: int, slot: int):
+        """Hiển thị kết quả test PLC (main thread)"""
+        try:
+            future.result()
+        except Exception as e:
+            self._add_log(f"❌ Lỗi kết nối PLC: {str(e)}")
+            messagebox.showerror("Lỗi", f"Không thể kết nối PLC:\n{str(e)}")
+            return
+        
+        self._add_log(f"✅ Kết nối PLC thành công: {ip}")
+        messagebox.showinfo("Thành công", f"Kết nối PLC thành công!\nIP: {ip}\nRack: {rack}\nSlot: {slot}")
     
     def _load_config_file(self):
         """Load file config khác"""
         path = filedialog.askopenfilename(title="Chọn file cấu hình",
                                          filetypes=[("JSON files", "*.json")])
         if path:
+            self._flush_config()
             try:
                 self.config = load_config(path)
                 self.config_path = path
@@ -820,6 +1001,7 @@ class MainWindow:
                                            defaultextension=".json",
                                            filetypes=[("JSON files", "*.json")])
         if path:
+            self._flush_config()
             try:
                 # Update system info
                 widgets = self._config_widgets.get('system', {})
@@ -840,6 +1022,7 @@ class MainWindow:
     
     def _reload_config(self):
         """Reload config từ file"""
+        self._flush_config()
         try:
             self.config = load_config(self.config_path)
             self._add_log(f"✅ Đã reload: {self.config_path}")
@@ -850,7 +1033,9 @@ class MainWindow:
     # ==================== Monitoring (Production Mode) ====================
     def _start_monitoring(self):
         """Bắt đầu giám sát - Production mode với OptimizedCameraWorker"""
-        from ..core import ProductionMultiCameraApp
+        if self._is_monitoring or any(f is not None and not f.done()
+                                      for f in (self._start_future, self._stop_future)):
+            return
         
         self._add_log("🚀 Khởi động Production Mode (24/7)...")
         self._start_btn.config(state=tk.DISABLED)
@@ -859,47 +1044,83 @@ class MainWindow:
         for panel in self._camera_panels.values():
             panel.set_status("connecting")
         
-        def start():
-            try:
-                # Init production app
-                self._app = ProductionMultiCameraApp(
-                    config=self.config,
-                    on_alert=self._on_production_alert,
-                    on_log=self._add_log,
-                )
-                
-                self._add_log("🔄 Loading YOLO model(s)...")
-                if self._app.load_models():
-                    results = self._app.start_all()
-                    success = sum(1 for r in results.values() if r)
-                    
-                    self._is_monitoring = True
-                    self._start_time = time.time()
-                    
-                    self._add_log(f"✅ Production mode: {success}/{len(results)} cameras ready")
-                    self.root.after(0, lambda: self._stop_btn.config(state=tk.NORMAL))
-                    self.root.after(0, lambda: self._global_status.config(
-                        text=f"🟢 {success} cameras (24/7)", fg=COLORS['success']))
-                else:
-                    raise Exception("Không thể load model!")
-            except Exception as e:
-                self._add_log(f"❌ Lỗi: {str(e)}")
-                import traceback
-                traceback.print_exc()
-                self.root.after(0, lambda: self._start_btn.config(state=tk.NORMAL))
-                self.root.after(0, lambda: self._global_status.config(text="❌ Lỗi", fg=COLORS['error']))
+        self._start_future = self._bg.submit(self._do_start)
+        self._start_future.add_done_callback(
+            lambda f: self._post(self._after_start, f))
+    
+    def _do_start(self):
+        """Init app + load model + start cameras (chạy trong thread nền)
+        
+        Returns:
+            (success, total) số camera đã start
+        """
+        from ..core import ProductionMultiCameraApp
+        
+        # Init production app
+        self._app = ProductionMultiCameraApp(
+            config=self.config,
+            on_alert=self._on_production_alert,
+            on_log=self._add_log,
+        )
         
-        threading.Thread(target=start, daemon=True).start()
+        self._add_log("🔄 Loading YOLO model(s)...")
+        if not self._app.load_models():
+            raise Exception("Không thể load model!")
+        
+        results = self._app.start_all()
+        return sum(1 for r in results.values() if r), len(results)
+    
+    def _after_start(self, future):
+        """Cập nhật UI sau khi _do_start xong (main thread)"""
+        if self._closing:
+            return  # _on_close đang dừng các camera vừa start
+        try:
+            success, total = future.result()
+        except Exception as e:
+            self._add_log(f"❌ Lỗi: {str(e)}")
+            import traceback
+            traceback.print_exception(type(e), e, e.__traceback__)
+            self._start_btn.config(state=tk.NORMAL)
+            self._global_status.config(text="❌ Lỗi", fg=COLORS['error'])
+            return
+        
+        self._is_monitoring = True
+        self._start_time = time.time()
+        
+        # Đặt kích thước hiển thị + đăng ký nhận frame đẩy từ worker
+        self._update_camera_status()
+        for worker in self._app.workers.values():
+            worker.frame_callback = self._on_worker_frame
+        
+        self._add_log(f"✅ Production mode: {success}/{total} cameras ready")
+        self._stop_btn.config(state=tk.NORMAL)
+        self._global_status.config(text=f"🟢 {success} cameras (24/7)", fg=COLORS['success'])
     
     def _stop_monitoring(self):
-        """Dừng giám sát"""
+        """Dừng giám sát - stop_all (join các worker) chạy ở thread nền"""
+        self._is_monitoring = False
         if self._app:
             self._add_log("⏹️ Đang dừng Production mode...")
             self._stop_btn.config(state=tk.DISABLED)
-            self._app.stop_all()
-            self._app = None
-        
-        self._is_monitoring = False
+            self._detach_frame_callbacks()
+            app, self._app = self._app, None
+            self._stop_future = self._bg.submit(app.stop_all)
+            self._stop_future.add_done_callback(
+                lambda f: self._post(self._after_stop, f))
+            return
+        self._after_stop(None)
+    
+    def _post(self, fn, *args):
+        """Hẹn fn(*args) ở main thread (gọi từ thread nền), bỏ qua nếu root đã destroy"""
+        try:
+            self.root.after(0, fn, *args)
+        except (RuntimeError, tk.TclError):
+            pass
+    
+    def _after_stop(self, future):
+        """Cập nhật UI sau khi dừng xong (main thread)"""
+        if future is not None and future.exception() is not None:
+            self._add_log(f"❌ Lỗi khi dừng: {future.exception()}")
         
         for panel in self._camera_panels.values():
             panel.set_status("offline")
@@ -933,112 +1154,224 @@ class MainWindow:
                 self._add_log(f"✅ Camera {camera_id}: Đã tắt cảnh báo than")
     
     def _add_log(self, msg: str):
-        """Add log"""
-        def add():
-            ts = datetime.datetime.now().strftime("%H:%M:%S")
-            line = f"[{ts}] {msg}\n"
-            
-            self._log_text.insert(tk.END, line)
-            self._log_text.see(tk.END)
-            
-            if hasattr(self, '_sys_log'):
-                self._sys_log.insert(tk.END, line)
-                self._sys_log.see(tk.END)
-            
-            # Limit
-            if int(self._log_text.index('end-1c').split('.')[0]) > 100:
-                self._log_text.delete('1.0', '10.0')
+        """Add log - gọi được từ mọi thread, _fast_tick ghi ra widget theo lô"""
+        ts = self._timestamp()
+        self._log_queue.append(f"[{ts}] {msg}\n")
+    
+    def _timestamp(self) -> str:
+        """Giờ hiện tại "HH:MM:SS", cache theo giây"""
+        sec = int(time.time())
+        last_sec, last_str = self._last_ts
+        if sec == last_sec:
+            return last_str
+        ts = time.strftime("%H:%M:%S", time.localtime(sec))
+        self._last_ts = (sec, ts)
+        return ts
+    
+    def _flush_logs(self):
+        """Ghi các dòng log đang chờ vào widget bằng 1 lần insert"""
+        if not self._log_queue:
+            return
+        lines = []
+        popleft = self._log_queue.popleft
+        for _ in range(min(len(self._log_queue), self._log_flush_max)):
+            lines.append(popleft())
+        text = ''.join(lines)
+        n = text.count('\n')
+        
+        self._log_lines = self._write_log(self._log_text, self._log_lines, lines, text, n)
+        self._log_text.see(tk.END)
+        
+        if hasattr(self, '_sys_log'):
+            self._sys_log_lines = self._write_log(self._sys_log, self._sys_log_lines, lines, text, n)
+            self._sys_log.see(tk.END)
+        else:
+            self._sys_log_pending.extend(lines)
+    
+    def _write_log(self, widget, count: int, lines: List[str], text: str, n: int) -> int:
+        """Ghi 1 lô log vào widget, trả về số dòng sau khi ghi
+        
+        Lô đủ lớn để đẩy hết nội dung cũ ra -> thay cả widget bằng phần đuôi
+        của lô (không insert rồi xóa lại phần lớn vừa insert).
+        """
+        max_lines = self.config.max_log_lines
+        if n >= max_lines:
+            tail = ''.join(lines[-max_lines:])
+            widget.delete('1.0', tk.END)
+            widget.insert(tk.END, tail)
+            return tail.count('\n')
+        widget.insert(tk.END, text)
+        return self._trim_log(widget, count + n)
+    
+    def _trim_log(self, widget, count: int) -> int:
+        """Xóa các dòng cũ nhất khi vượt ngưỡng, trả về số dòng còn lại"""
+        max_lines = self.config.max_log_lines
+        if count <= max_lines + self._log_trim_chunk:
+            return count
+        widget.delete('1.0', f'{count - max_lines + 1}.0')
+        return max_lines
+    
+    def _clear_sys_log(self):
+        """Xóa log hệ thống"""
+        self._sys_log.delete(1.0, tk.END)
+        self._sys_log_lines = 0
+    
+    def _fast_tick(self):
+        """GUI loop nhanh - giao frame worker đã báo, ghi log theo lô"""
+        self._deliver_frames()
+        try:
+            self._flush_logs()
+        except Exception as e:
+            # Không ghi được log ra widget -> in ra console
+            print(f"[WARN] Lỗi ghi log: {e}")
         
-        self.root.after(0, add)
+        self.root.after(self._fast_interval_ms, self._fast_tick)
     
-    def _update_loop(self):
-        """GUI loop ~25 FPS - Production mode"""
+    def _slow_tick(self):
+        """GUI loop chậm - đồng hồ, uptime, thống kê, trạng thái camera"""
         try:
-            # Camera displays - lấy frame từ workers
-            if self._current_tab == "monitor" and self._app and self._is_monitoring:
-                self._update_camera_displays()
-            
-            # Status mỗi 500ms
-            now = int(time.time() * 1000)
-            if not hasattr(self, '_last_upd') or now - self._last_upd > 500:
-                self._last_upd = now
-                self._update_status()
+            self._update_status()
+            self._update_camera_status()
         except Exception as e:
-            pass
+            # Chỉ log khi lỗi khác lần trước (tick chạy mỗi giây)
+            msg = f"⚠️ Lỗi cập nhật trạng thái: {e}"
+            if msg != self._last_tick_error:
+                self._last_tick_error = msg
+                self._add_log(msg)
         
-        self.root.after(40, self._update_loop)
+        self.root.after(self._slow_interval_ms, self._slow_tick)
+    
+    def _on_worker_frame(self, cam_id: int):
+        """Worker có frame mới (gọi từ thread worker) - chỉ đánh dấu, không gọi Tk"""
+        with self._deliver_lock:
+            self._frame_ready.add(cam_id)
     
-    def _update_camera_displays(self):
-        """Cập nhật hiển thị từ production workers"""
-        if not hasattr(self._app, 'workers'):
+    def _detach_frame_callbacks(self):
+        """Gỡ frame_callback trước khi dừng worker"""
+        if self._app is not None and hasattr(self._app, 'workers'):
+            for worker in self._app.workers.values():
+                worker.frame_callback = None
+    
+    def _deliver_frames(self):
+        """Giao các frame đã được worker báo (main thread, mỗi fast tick)"""
+        if not self._frame_ready:
+            return
+        with self._deliver_lock:
+            ready = self._frame_ready
+            self._frame_ready = set()
+        self._update_camera_displays(ready)
+    
+    def _camera_workers(self):
+        """(cam_id, worker, panel) cho các camera đang giám sát có panel"""
+        if not (self._is_monitoring and self._app is not None and hasattr(self._app, 'workers')):
             return
-        
-        from ..core import WorkerStatus
-        
         for cam_id, worker in self._app.workers.items():
             # cam_id là số nguyên (1, 2, 3...)
             panel = self._camera_panels.get(cam_id)
-            
-            if panel is None:
-                # Debug: in ra nếu không tìm thấy panel
-                # print(f"[DEBUG] Panel not found for cam_id={cam_id}, available keys={list(self._camera_panels.keys())}")
-                continue
-            
-            # Update FPS
+            if panel is not None:
+                yield cam_id, worker, panel
+    
+    @staticmethod
+    def _apply_worker_status(worker, panel: CameraPanel):
+        """Đồng bộ trạng thái kết nối của worker lên header panel"""
+        status = worker.status
+        if status is WorkerStatus.RUNNING and (worker.person_alarm_active or worker.coal_alarm_active):
+            panel.set_status("alarm")
+        else:
+            panel.set_status(_PANEL_STATUS.get(status, "offline"))
+    
+    def _update_camera_status(self):
+        """FPS, trạng thái, kích thước hiển thị của từng camera (slow tick)
+        
+        Camera mất kết nối không đẩy frame nên trạng thái cập nhật ở đây.
+        """
+        for cam_id, worker, panel in self._camera_workers():
             worker.update_fps()
-            
-            # Update connection status
-            if worker.status == WorkerStatus.RUNNING:
-                if worker.person_alarm_active or worker.coal_alarm_active:
-                    panel.set_status("alarm")
-                else:
-                    panel.set_status("online")
-            elif worker.status == WorkerStatus.RECONNECTING:
-                panel.set_status("reconnecting")
-            elif worker.status == WorkerStatus.STARTING:
-                panel.set_status("connecting")
+            self._apply_worker_status(worker, panel)
+            # Worker letterbox + BGR->RGB theo kích thước panel (ngoài main thread)
+            worker.set_display_size(*panel.display_size)
+    
+    def _update_camera_displays(self, cam_ids):
+        """Nhận frame mới của các camera trong cam_ids và vẽ lại panel tương ứng"""
+        if self._current_tab != "monitor":
+            return
+        
+        for cam_id, worker, panel in self._camera_workers():
+            if cam_id not in cam_ids:
+                continue
+            try:
+                self._receive_frame(cam_id, worker, panel)
+            except Exception as e:
+                # Lỗi lặp lại mỗi frame -> chỉ log lần đầu của mỗi camera
+                if cam_id not in self._frame_errors:
+                    self._frame_errors.add(cam_id)
+                    self._add_log(f"⚠️ Cam {cam_id}: lỗi hiển thị frame: {e}")
+        
+        # Vẽ các panel có frame mới trong 1 lượt, rồi để Tk xử lý redraw 1 lần
+        if self._dirty_panels:
+            for cam_id in self._dirty_panels:
+                panel = self._camera_panels.get(cam_id)
+                if panel is not None and panel._dirty:
+                    panel.process_display()
+            self._dirty_panels.clear()
+            self.root.update_idletasks()
+    
+    def _receive_frame(self, cam_id: int, worker, panel: CameraPanel):
+        """Nhận frame mới + kết quả của 1 camera vào panel (main thread)"""
+        self._apply_worker_status(worker, panel)
+        
+        # Frame chưa đổi từ lần trước -> không lấy lock/frame của worker
+        last_seq = self._last_src_seq.get(cam_id)
+        fresh = worker.frame_seq != last_seq
+        min_interval = self._panel_min_interval.get(cam_id)
+        if fresh and min_interval:
+            now = time.monotonic()
+            if now - self._last_panel_update.get(cam_id, 0.0) < min_interval:
+                fresh = False
             else:
-                panel.set_status("offline")
-            
-            # Get frame từ worker (atomic, low-latency)
-            frame = worker.get_display_frame(copy=True)
-            
-            # Debug: in frame info mỗi 100 lần
-            if not hasattr(self, '_debug_counter'):
-                self._debug_counter = {}
-            if cam_id not in self._debug_counter:
-                self._debug_counter[cam_id] = 0
-            self._debug_counter[cam_id] += 1
+                self._last_panel_update[cam_id] = now
+        
+        if fresh:
+            # Get bản copy frame RGB từ worker (copy dưới lock của worker)
+            seq, frame = worker.get_display_rgb()
             
-            if self._debug_counter[cam_id] == 1:
+            # Debug: in frame info lần đầu (bật bằng config.debug_frames)
+            if self._debug_frames and cam_id not in self._debug_seen:
+                self._debug_seen.add(cam_id)
                 print(f"[DEBUG] Cam {cam_id}: status={worker.status.value}, frame={'OK' if frame is not None else 'None'}, frame_count={worker._frame_count}")
             
-            if frame is not None:
+            # Chỉ nhận frame khi worker đã publish frame mới
+            if frame is not None and seq != last_seq:
+                self._last_src_seq[cam_id] = seq
                 panel.update_frame(frame)
                 panel.update_stats(worker.fps_display, worker.last_coal_ratio, worker.last_person_detected)
-            
-            # Process result nếu có
-            result = worker.get_latest_result()
-            if result is not None:
-                _, yolo_result, coal_blocked, coal_ratio = result
-                worker.clear_result()
-            
-            # Process display
-            panel.process_display()
+                self._dirty_panels.add(cam_id)
+        
+        # Process result nếu có
+        result = worker.get_latest_result()
+        if result is not None:
+            _, yolo_result, coal_blocked, coal_ratio = result
+            worker.clear_result()
+    
+    def _set_status_text(self, key: str, text: str):
+        """Ghi StringVar của label trạng thái, bỏ qua nếu text không đổi"""
+        if self._last_status_text.get(key) != text:
+            self._status_vars[key].set(text)
+            self._last_status_text[key] = text
     
     def _update_status(self):
         """Update status"""
-        self._time_lbl.config(text=datetime.datetime.now().strftime("%H:%M:%S"))
+        self._set_status_text("time", self._timestamp())
         
         if self._app and self._is_monitoring:
             stats = self._app.get_stats()
-            self._status_lbls["cameras"].config(text=f"Cameras: {stats.running_cameras}/{stats.total_cameras}")
-            self._status_lbls["person"].config(text=f"Cảnh báo người: {stats.total_person_alerts}")
-            self._status_lbls["coal"].config(text=f"Cảnh báo than: {stats.total_coal_alerts}")
+            self._set_status_text("cameras", f"Cameras: {stats.running_cameras}/{stats.total_cameras}")
+            self._set_status_text("person", f"Cảnh báo người: {stats.total_person_alerts}")
+            self._set_status_text("coal", f"Cảnh báo than: {stats.total_coal_alerts}")
             
             if self._start_time and self._is_monitoring:
                 up = int(time.time() - self._start_time)
-                self._status_lbls["uptime"].config(text=f"Uptime: {up//3600:02d}:{(up%3600)//60:02d}:{up%60:02d}")
+                self._set_status_text("uptime", f"Uptime: {up//3600:02d}:{(up%3600)//60:02d}:{up%60:02d}")
     
     def run(self):
         """Run"""
@@ -1052,9 +1385,35 @@ class MainWindow:
     
     def _on_close(self):
         """Close"""
-        if self._app and self._app.is_any_running:
-            if messagebox.askokcancel("Xác nhận", "Dừng cameras và thoát?"):
-                self._app.stop_all()
-                self.root.destroy()
+        if self._closing:
+            return
+        self._flush_config()
+        start = self._start_future
+        starting = start is not None and not start.done() and not start.cancel()
+        if starting or (self._app and self._app.is_any_running):
+            if not messagebox.askokcancel("Xác nhận", "Dừng cameras và thoát?"):
+                return
+            # Dừng ở thread nền (join worker có thể lâu), destroy khi xong
+            self._closing = True
+            self.root.withdraw()
+            self._bg.submit(self._stop_for_exit).add_done_callback(
+                lambda f: self._post(self._finish_close))
         else:
-            self.root.destroy()
+            self._finish_close()
+    
+    def _stop_for_exit(self):
+        """Chờ start/stop đang chạy xong rồi dừng mọi camera (thread nền)"""
+        for future in (self._start_future, self._stop_future):
+            if future is not None:
+                try:
+                    future.result()
+                except Exception:
+                    pass
+        if self._app is not None:
+            self._detach_frame_callbacks()
+            self._app.stop_all()
+    
+    def _finish_close(self):
+        """Đóng thread nền và cửa sổ (main thread)"""
+        self._bg.shutdown(wait=False)
+        self.root.destroy()
@@ -8,8 +8,6 @@ Cho phép người dùng click để đặt các điểm ROI thay vì nhập t
 
 import tkinter as tk
 from tkinter import messagebox
-import cv2
-from PIL import Image, ImageTk
 import numpy as np
 from typing import List, Tuple, Optional, Callable
 
@@ -27,6 +25,9 @@ class ROIEditor(tk.Toplevel):
         )
     """
     
+    POINT_RADIUS = 6
+    POINT_FONT = ('Arial', 9)
+    
     def __init__(
         self, 
         parent, 
@@ -51,6 +52,21 @@ class ROIEditor(tk.Toplevel):
         self.scale_x = self.display_width / w
         self.scale_y = self.display_height / h
         self.original_size = (w, h)
+        # Hệ số display -> gốc (nhân thay vì chia mỗi lần click)
+        self._inv_sx = w / self.display_width
+        self._inv_sy = h / self.display_height
+        
+        # Nền đã resize + RGB - frame không đổi trong suốt phiên sửa nên chỉ tính 1 lần
+        import cv2
+        self._base_rgb = cv2.cvtColor(
+            cv2.resize(frame, (self.display_width, self.display_height), interpolation=cv2.INTER_AREA),
+            cv2.COLOR_BGR2RGB
+        )
+        self._ppm_header = b"P6\n%d %d\n255\n" % (self.display_width, self.display_height)
+        
+        # Màu overlay ROI (vẽ bằng item native của Tk canvas)
+        self._fill_color = '#e94560' if roi_type == 'coal' else '#0f4c75'
+        self._outline_color = '#ff6464' if roi_type == 'coal' else '#64c8ff'
         
         # UI setup
         self.title(f"Vẽ vùng ROI - {roi_type.upper()}")
@@ -62,6 +78,11 @@ class ROIEditor(tk.Toplevel):
         self.grab_set()
         
         self._create_widgets()
+        
+        # Ảnh nền cố định - upload lên Tk đúng 1 lần, overlay vẽ đè bằng tag 'roi'
+        self.photo = tk.PhotoImage(data=self._ppm_header + self._base_rgb.tobytes(), format='PPM')
+        self.canvas.create_image(0, 0, anchor=tk.NW, image=self.photo, tags='bg')
+        
         self._draw_frame()
     
     def _create_widgets(self):
@@ -157,57 +178,57 @@ class ROIEditor(tk.Toplevel):
         self.info_label.pack(side=tk.LEFT)
     
     def _draw_frame(self):
-        """Vẽ frame lên canvas"""
-        # Resize frame
-        frame_resized = cv2.resize(
-            self.frame, 
-            (self.display_width, self.display_height),
-            interpolation=cv2.INTER_AREA
-        )
-        
-        # Convert to RGB
-        frame_rgb = cv2.cvtColor(frame_resized, cv2.COLOR_BGR2RGB)
-        
-        # Draw existing points and lines
-        if len(self.points) > 0:
-            # Scale points for display
-            display_points = [
-                (int(x * self.scale_x), int(y * self.scale_y)) 
-                for (x, y) in self.points
-            ]
-            
-            # Draw filled polygon (semi-transparent)
-            overlay = frame_rgb.copy()
-            pts = np.array(display_points, dtype=np.int32)
-            color = (233, 69, 96) if self.roi_type == 'coal' else (15, 76, 117)
-            cv2.fillPoly(overlay, [pts], color)
-            frame_rgb = cv2.addWeighted(frame_rgb, 0.7, overlay, 0.3, 0)
-            
-            # Draw polygon outline
-            outline_color = (255, 100, 100) if self.roi_type == 'coal' else (100, 200, 255)
-            cv2.polylines(frame_rgb, [pts], isClosed=True, color=outline_color, thickness=2)
-            
-            # Draw points
-            for i, (x, y) in enumerate(display_points):
-                cv2.circle(frame_rgb, (x, y), 6, (255, 255, 255), -1)
-                cv2.circle(frame_rgb, (x, y), 6, outline_color, 2)
-                cv2.putText(frame_rgb, str(i+1), (x+10, y-10), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        """Vẽ overlay ROI lên canvas (nền giữ nguyên, chỉ vẽ lại item 'roi')"""
+        self.canvas.delete('roi')
         
-        # Convert to PhotoImage
-        pil_image = Image.fromarray(frame_rgb)
-        self.photo = ImageTk.PhotoImage(pil_image)
-        
-        # Update canvas
-        self.canvas.delete("all")
-        self.canvas.create_image(0, 0, anchor=tk.NW, image=self.photo)
+        display_points = self._display_points()
+        self._draw_roi_shape(display_points)
+        for i, (x, y) in enumerate(display_points):
+            self._draw_point(i, x, y)
         
         # Update points list
         self.points_listbox.delete(0, tk.END)
-        for i, (x, y) in enumerate(self.points):
-            self.points_listbox.insert(tk.END, f"{i+1}: ({x}, {y})")
-        
-        # Update info
+        self.points_listbox.insert(
+            tk.END, *[f"{i+1}: ({x}, {y})" for i, (x, y) in enumerate(self.points)]
+        )
+        self._update_info()
+    
+    def _display_points(self) -> List[List[int]]:
+        """Scale points for display - 1 phép nhân mảng cho tất cả điểm"""
+        return (np.asarray(self.points, dtype=np.float64).reshape(-1, 2)
+                * (self.scale_x, self.scale_y)).astype(np.int32).tolist()
+    
+    def _draw_roi_shape(self, display_points: List[List[int]]):
+        """Vẽ polygon (>= 3 điểm) hoặc đoạn thẳng (2 điểm), nằm dưới các điểm"""
+        self.canvas.delete('roi_shape')
+        if len(display_points) >= 3:
+            # Polygon bán trong suốt (stipple) + viền
+            self.canvas.create_polygon(
+                display_points, fill=self._fill_color, stipple='gray50',
+                outline=self._outline_color, width=2, tags=('roi', 'roi_shape')
+            )
+        elif len(display_points) == 2:
+            self.canvas.create_line(
+                display_points, fill=self._outline_color, width=2, tags=('roi', 'roi_shape')
+            )
+        else:
+            return
+        self.canvas.tag_raise('roi_shape', 'bg')
+    
+    def _draw_point(self, i: int, x: int, y: int):
+        """Vẽ 1 điểm ROI + số thứ tự"""
+        r = self.POINT_RADIUS
+        self.canvas.create_oval(
+            x - r, y - r, x + r, y + r,
+            fill='white', outline=self._outline_color, width=2, tags='roi'
+        )
+        self.canvas.create_text(
+            x + 10, y - 10, text=str(i + 1), anchor=tk.SW,
+            fill='white', font=self.POINT_FONT, tags='roi'
+        )
+    
+    def _update_info(self):
+        """Cập nhật dòng thông tin số điểm"""
         self.info_label.config(
             text=f"Điểm: {len(self.points)} | Kích thước gốc: {self.original_size[0]}x{self.original_size[1]}"
         )
@@ -215,15 +236,22 @@ class ROIEditor(tk.Toplevel):
     def _on_left_click(self, event):
         """Thêm điểm khi click trái"""
         # Convert display coordinates to original
-        x = int(event.x / self.scale_x)
-        y = int(event.y / self.scale_y)
+        w, h = self.original_size
+        x = int(event.x * self._inv_sx)
+        y = int(event.y * self._inv_sy)
         
         # Clamp to valid range
-        x = max(0, min(x, self.original_size[0] - 1))
-        y = max(0, min(y, self.original_size[1] - 1))
+        x = 0 if x < 0 else (w - 1 if x >= w else x)
+        y = 0 if y < 0 else (h - 1 if y >= h else y)
         
         self.points.append((x, y))
-        self._draw_frame()
+        
+        # Chỉ vẽ thêm điểm mới + cập nhật hình, không vẽ lại toàn bộ điểm cũ
+        display_points = self._display_points()
+        self._draw_roi_shape(display_points)
+        self._draw_point(len(self.points) - 1, *display_points[-1])
+        self.points_listbox.insert(tk.END, f"{len(self.points)}: ({x}, {y})")
+        self._update_info()
     
     def _on_right_click(self, event):
         """Xóa điểm cuối khi click phải"""
@@ -289,6 +317,7 @@ def open_roi_editor(
         on_save: Callback khi lưu
     """
     # Capture one frame
+    import cv2
     cap = cv2.VideoCapture(video_source)
     ret, frame = cap.read()
     cap.release()